@@ -12,6 +12,9 @@ FASTAPI_URL = os.environ.get("FASTAPI_URL", 'http://localhost:8090/')
 REDIS_HOST = os.environ.get("REDIS_HOST", 'redis')
 REDIS_PORT = os.environ.get("REDIS_PORT", '6379')
 
+# Number of tasks in the list message, to fit into the Telegram message limit
+TASKS_PAGE_SIZE = int(os.environ.get("TASKS_PAGE_SIZE", 30))
+
 # Task date format
 DATE_FORMAT = '%d.%m.%Y %H:%M'
 
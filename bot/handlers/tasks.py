@@ -10,7 +10,6 @@ from aiogram.types import ErrorEvent
 from aiogram_dialog import DialogManager, StartMode
 from aiogram_dialog.api.exceptions import NoContextError
 from config import BOT_USERNAME, SERVER_TZ, USER_TZ
-from services.comments import delete_comment_by_task
 from services.exceptions import APIError
 from services.tasks import (
     delete_task,
@@ -98,7 +97,7 @@ async def _handle_error_state(new_state, dialog_manager, dialog_data):
 
 async def list_tasks(state: FSMContext, **kwargs):
     """
-    Retrieves all tasks and formats them for display.
+    Retrieves the first page of tasks and formats them for display.
     Returns a dictionary with the formatted text for the task list.
     """
     tasks = await get_tasks(state)
@@ -106,7 +105,10 @@ async def list_tasks(state: FSMContext, **kwargs):
     if not tasks['tasks']:
         return {'text': 'У Вас нет задач'}
 
-    return {"text": await _format_task_list(tasks['tasks'])}
+    text = await _format_task_list(tasks['tasks'])
+    if tasks.get('next_cursor'):
+        text += f"\n<i>Показаны первые {len(tasks['tasks'])} задач</i>"
+    return {"text": text}
 
 
 async def _format_task_list(tasks):
@@ -294,9 +296,8 @@ async def _create_new_task(dialog_manager, state, updated_data):
 
 async def delete_task_data(dialog_manager: DialogManager, state: FSMContext, **kwargs):
     """
-    Deletes a task and its associated comments.
+    Deletes a task, its comments are removed by the API in the background.
     """
     task_id = dialog_manager.dialog_data.get("api_task", {}).get("id")
-    await delete_comment_by_task(state, task_id)
     await delete_task(state, task_id)
     await dialog_manager.switch_to(TaskStates.LIST)
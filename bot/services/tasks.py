@@ -1,22 +1,24 @@
 from aiogram.fsm.context import FSMContext
+from config import TASKS_PAGE_SIZE
 from services.base import api_request
 from services.auth import _get_auth_headers
 
 
 async def get_tasks(state: FSMContext):
     """
-    Fetches the list of tasks for the user.
+    Fetches the first page of the list of tasks for the user.
 
     Args:
         state (FSMContext): The FSM context to retrieve the token.
 
     Returns:
-        dict: The response data from the API request.
+        dict: The response data from the API request, with the `next_cursor`
+            of the next page if the user has more tasks.
     """
     headers = await _get_auth_headers(state)
     return await api_request(
         'GET',
-        'api/tasks',
+        f'api/tasks?limit={TASKS_PAGE_SIZE}',
         headers=headers,
     )
 
@@ -1,19 +1,211 @@
-from db import get_db
-from dependencies.auth import check_task_ownership
-from dependencies.cache import get_redis_client
-from fastapi import APIRouter, Depends, HTTPException
+from cache.ownership import OwnershipCache
+from db import AsyncSessionLocal, get_db
+from events.comments import CommentEvents
+from events.live import comment_events_sse
+from dependencies.auth import (
+    check_task_ownership,
+    check_tasks_ownership,
+    get_owned_task_ids,
+    security,
+)
+from dependencies.cache import get_blocking_redis_client, get_redis_client
+from dependencies.events import get_comment_event_waiters, get_comment_events
+from dependencies.http import get_http_client
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Security
+from fastapi.responses import Response, StreamingResponse
 from schemas.comment import (
+    CommentCountsResponse,
     CommentCreate,
+    CommentEventsResponse,
+    CommentSearchResponse,
+    CommentsBatchCreate,
     CommentsResponse,
     CommentResponse,
     CommentUpdate,
+    TasksCommentsResponse,
 )
 from services.comments import CommentService
+from settings import settings
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
 
+def parse_task_ids(task_ids) -> list[str]:
+    """
+    Removes the repeated tasks of a batch request and checks their number.
+
+    Args:
+        task_ids (Iterable [str]): identifiers of the tasks of the request.
+
+    RAISES:
+        Httpexception: If there are more than `COMMENTS_BATCH_MAX_TASKS` distinct tasks.
+
+    Returns:
+        list [str]: distinct identifiers of the tasks in the order of the request.
+    """
+    task_ids = list(dict.fromkeys(task_ids))
+    if len(task_ids) > settings.COMMENTS_BATCH_MAX_TASKS:
+        raise HTTPException(status_code=400, detail="Слишком много задач в запросе")
+    return task_ids
+
+
+async def _read_comment_events(redis, task_ids, after, count, block_ms):
+    """
+    Reads the comment events, answering 400 on a malformed `after`.
+    """
+    try:
+        events, last_id, truncated = await CommentEvents.read(
+            redis, task_ids, after, count, block_ms
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Неверный курсор")
+    return {"events": events, "last_id": last_id, "truncated": truncated}
+
+
+@router.get("/batch", response_model=TasksCommentsResponse)
+async def get_comments_by_tasks(
+    task_ids: list[str] = Query(..., alias="task_id"),
+    latest: int = Query(
+        settings.COMMENTS_BATCH_LATEST_DEFAULT,
+        ge=0,
+        le=settings.COMMENTS_PAGE_MAX_LIMIT,
+    ),
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis_client),
+    user_token=Security(security),
+    client=Depends(get_http_client),
+):
+    """
+    Receives the number of comments and the `latest` comments for each of the tasks.
+
+    Tasks are passed as repeated `task_id` query parameters, and their
+    ownership is checked with a single request to the Django API.
+    """
+    task_ids = parse_task_ids(task_ids)
+
+    await check_tasks_ownership(task_ids, user_token, redis, client)
+    tasks = await CommentService.get_tasks_summary(db, redis, task_ids, latest)
+    return {"tasks": tasks}
+
+
+@router.get("/counts", response_model=CommentCountsResponse)
+async def get_comment_counts(
+    task_ids: list[str] = Query(..., alias="task_id"),
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis_client),
+    user_token=Security(security),
+    client=Depends(get_http_client),
+):
+    """
+    Receives the number of comments for each of the tasks.
+
+    Counters are kept up to date on every change of the comments, so the
+    endpoint does not touch the comments themselves.
+    """
+    task_ids = parse_task_ids(task_ids)
+
+    await check_tasks_ownership(task_ids, user_token, redis, client)
+    counts = await CommentService.get_comment_counts(db, redis, task_ids)
+    return {"counts": counts}
+
+
+@router.get("/search", response_model=CommentSearchResponse)
+async def search_comments(
+    q: str = Query(..., min_length=1, max_length=256),
+    task_ids: list[str] = Query(None, alias="task_id"),
+    limit: int = Query(
+        settings.COMMENTS_SEARCH_DEFAULT_LIMIT,
+        ge=1,
+        le=settings.COMMENTS_SEARCH_MAX_LIMIT,
+    ),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis_client),
+    user_token=Security(security),
+    client=Depends(get_http_client),
+):
+    """
+    Searches the comments of the user's tasks, the most relevant first.
+
+    The search can be narrowed to the tasks passed as repeated `task_id`
+    query parameters, otherwise all the tasks of the user are searched.
+    """
+    if task_ids:
+        task_ids = parse_task_ids(task_ids)
+        await check_tasks_ownership(task_ids, user_token, redis, client)
+    else:
+        task_ids = await get_owned_task_ids(user_token, client)
+
+    try:
+        results, next_cursor = await CommentService.search_comments(
+            db, task_ids, q, limit, cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Неверный курсор")
+    return {"results": results, "next_cursor": next_cursor}
+
+
+@router.get("/events", response_model=CommentEventsResponse)
+async def read_comment_events(
+    task_ids: list[str] = Query(..., alias="task_id"),
+    after: str = None,
+    count: int = Query(
+        settings.COMMENTS_EVENTS_READ_COUNT,
+        ge=1,
+        le=settings.COMMENTS_EVENTS_READ_COUNT,
+    ),
+    block_ms: int = Query(0, ge=0, le=settings.COMMENTS_EVENTS_MAX_BLOCK_MS),
+    redis=Depends(get_redis_client),
+    blocking_redis=Depends(get_blocking_redis_client),
+    waiters=Depends(get_comment_event_waiters),
+    user_token=Security(security),
+    client=Depends(get_http_client),
+):
+    """
+    Receives the changes of the comments of the tasks since the event `after`.
+
+    Without `after` no events are returned, only the `last_id` to start
+    from. With `block_ms` the request waits for the changes (long polling)
+    on a separate Redis pool, at most `COMMENTS_EVENTS_MAX_WAITERS` requests
+    per worker wait at once.
+    """
+    task_ids = parse_task_ids(task_ids)
+
+    await check_tasks_ownership(task_ids, user_token, redis, client)
+    if after is None or not block_ms:
+        return await _read_comment_events(redis, task_ids, after, count, 0)
+    if waiters.locked():
+        raise HTTPException(
+            status_code=503, detail="Слишком много ожидающих запросов"
+        )
+    async with waiters:
+        return await _read_comment_events(
+            blocking_redis, task_ids, after, count, block_ms
+        )
+
+
+@router.post("/batch", response_model=CommentsResponse)
+async def create_comments(
+    batch: CommentsBatchCreate,
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis_client),
+    user_token=Security(security),
+    client=Depends(get_http_client),
+):
+    """
+    Creates several comments at once, e.g. when importing them from another tracker.
+
+    The ownership is checked once per task of the batch, and nothing is
+    created unless all the tasks belong to the user.
+    """
+    task_ids = parse_task_ids(comment.task_id for comment in batch.comments)
+
+    await check_tasks_ownership(task_ids, user_token, redis, client)
+    comments = await CommentService.create_comments(db, redis, batch.comments)
+    return {"comments": comments}
+
+
 @router.post("/{task_id}", response_model=CommentResponse)
 async def create_comment(
     task_id: str,
@@ -31,15 +223,70 @@ async def create_comment(
 @router.get("/{task_id}", response_model=CommentsResponse)
 async def get_comments_by_task(
     task_id: str,
+    limit: int = Query(None, ge=1, le=settings.COMMENTS_PAGE_MAX_LIMIT),
+    cursor: str = None,
     db: AsyncSession = Depends(get_db),
     redis=Depends(get_redis_client),
     is_owner: bool = Depends(check_task_ownership),
 ):
     """
-    Receives all the comments for the task.
+    Receives the comments for the task ordered by creation time.
+
+    Without `limit` and `cursor` all the comments are returned, otherwise one
+    page and the `next_cursor` to pass for the next one.
     """
-    comments = await CommentService.get_comments_by_task(db, redis, task_id)
-    return {"comments": comments}
+    if limit is None and cursor is None:
+        # Already serialized, mostly straight from the cache
+        content = await CommentService.get_comments_json(db, redis, task_id)
+        return Response(content=content, media_type="application/json")
+
+    try:
+        comments, next_cursor = await CommentService.get_comments_page(
+            db, redis, task_id, limit or settings.COMMENTS_PAGE_DEFAULT_LIMIT, cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Неверный курсор")
+    return {"comments": comments, "next_cursor": next_cursor}
+
+
+@router.get("/{task_id}/stream")
+async def stream_comments_by_task(
+    task_id: str,
+    is_owner: bool = Depends(check_task_ownership),
+):
+    """
+    Streams all the comments for the task as NDJSON, one comment per line.
+    """
+
+    async def comments_ndjson():
+        # The request session is closed before the body is sent
+        async with AsyncSessionLocal() as db:
+            async for line in CommentService.stream_comments(db, task_id):
+                yield line
+
+    return StreamingResponse(comments_ndjson(), media_type="application/x-ndjson")
+
+
+@router.get("/{task_id}/live")
+async def live_comment_events(
+    task_id: str,
+    last_event_id: str = Header(None),
+    redis=Depends(get_redis_client),
+    broadcaster=Depends(get_comment_events),
+    is_owner: bool = Depends(check_task_ownership),
+):
+    """
+    Pushes the changes of the comments for the task as Server-Sent Events.
+
+    Events are named after the type of the change ("created", "updated",
+    "deleted", "cleared") and carry the `CommentEvent` JSON. A "reset" event
+    means that changes were missed and the comments should be reloaded.
+    """
+    return StreamingResponse(
+        comment_events_sse(broadcaster, redis, task_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.delete("/{task_id}/{comment_id}")
@@ -70,6 +317,7 @@ async def delete_comments_by_task(
     Removes all comments for the task.
     """
     deleted_count = await CommentService.delete_comments_by_task(db, redis, task_id)
+    await OwnershipCache.invalidate_task(redis, task_id)
     if deleted_count == 0:
         raise HTTPException(status_code=404, detail="Комментарии не найдены")
     return {"detail": f"Удалено {deleted_count} комментариев"}
@@ -88,7 +336,7 @@ async def update_comment(
     Updates a comment for the task.
     """
     updated_comment = await CommentService.update_comment(
-        db, redis, comment_id, comment
+        db, redis, comment_id, task_id, comment
     )
     if not updated_comment:
         raise HTTPException(status_code=404, detail="Комментарий не найден")
@@ -0,0 +1,48 @@
+from db import get_db
+from dependencies.auth import check_service_token
+from dependencies.cache import get_redis_client
+from fastapi import APIRouter, Depends, Query
+from schemas.comment import CommentsMove
+from services.comments import CommentService
+from settings import settings
+from sqlalchemy.ext.asyncio import AsyncSession
+
+router = APIRouter(dependencies=[Depends(check_service_token)])
+
+
+@router.delete("/tasks/{task_id}/comments")
+async def purge_task_comments(
+    task_id: str,
+    batch_size: int = Query(
+        settings.COMMENTS_PURGE_BATCH_SIZE,
+        ge=1,
+        le=settings.COMMENTS_PURGE_BATCH_SIZE,
+    ),
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis_client),
+):
+    """
+    Removes the next batch of the comments of a task deleted in the Django API.
+
+    The caller repeats the request until `remaining` is false.
+    """
+    deleted_count, remaining = await CommentService.purge_comments_by_task(
+        db, redis, task_id, batch_size
+    )
+    return {"deleted": deleted_count, "remaining": remaining}
+
+
+@router.post("/tasks/{task_id}/comments/move")
+async def move_task_comments(
+    task_id: str,
+    move: CommentsMove,
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis_client),
+):
+    """
+    Moves the comments of a task to the new ID the Django API reissued for it.
+
+    Repeating the request is safe: the comments already moved are not found again.
+    """
+    moved_count = await CommentService.move_comments(db, redis, task_id, move.task_id)
+    return {"moved": moved_count}
@@ -0,0 +1,36 @@
+from db import engine
+from fastapi import APIRouter, Request
+
+router = APIRouter()
+
+
+@router.get("/redis")
+async def redis_pool_metrics(request: Request):
+    """
+    Returns the state of the Redis connection pool of the current worker.
+    """
+    return request.app.state.redis_pool.stats()
+
+
+@router.get("/redis-blocking")
+async def redis_blocking_pool_metrics(request: Request):
+    """
+    Returns the state of the Redis connection pool used by the blocking reads of the current worker.
+    """
+    return request.app.state.redis_blocking_pool.stats()
+
+
+@router.get("/db")
+async def db_pool_metrics():
+    """
+    Returns the state of the database connection pool of the current worker.
+    """
+    return engine.pool.stats()
+
+
+@router.get("/live")
+async def live_subscriptions_metrics(request: Request):
+    """
+    Returns the number of live comment subscriptions of the current worker.
+    """
+    return request.app.state.comment_events.stats()
@@ -0,0 +1,272 @@
+"""
+End-to-end latency and throughput of the comment endpoints under concurrency.
+
+The app is called in-process through the ASGI transport of httpx with its
+database and Redis pointed at a temporary SQLite file and fakeredis (or at
+real servers via --database-url / --redis-url). The Django API is replaced by
+a stub app with a configurable latency that owns every task. For each
+concurrency level measures:
+- list_cold: GET /comments/{task_id} with the cached list dropped before the request;
+- list_warm: GET /comments/{task_id} served from the cache;
+- create: POST /comments/{task_id};
+- update: PUT /comments/{task_id}/{comment_id};
+- delete: DELETE /comments/{task_id}/{comment_id};
+- bulk_delete: DELETE /comments/{task_id} of a task with --comments-per-task comments.
+The results carry the git revision, so runs on two commits can be compared
+with `python -m benchmarks.compare old.json new.json`.
+
+Run from the comments_api directory:
+    python -m benchmarks.api --concurrency 1 10 50 --output api.json
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.auth import make_token
+from benchmarks.common import create_engine, get_redis, git_revision, summarize
+
+import httpx
+from cache.comments import CommentCache
+from cache.counters import CommentCountCache
+from cache.ownership import OwnershipCache
+from db import get_db
+from fastapi import FastAPI, Request, Response
+from main import app
+from models.comment import Base, Comment, CommentCount
+from repositories.comments import CommentRepository
+from schemas.comment import CommentCreate
+from settings import settings
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+TASK_PREFIX = "benchmark-api-"
+CONTENT = "lorem ipsum " * 10
+
+
+def make_django_stub(latency: float, valid_token: str):
+    stub = FastAPI()
+    calls = {"count": 0}
+
+    def authorized(request) -> bool:
+        calls["count"] += 1
+        return request.headers.get("Authorization") == f"Bearer {valid_token}"
+
+    @stub.get("/api/tasks/owned")
+    async def owned_tasks(request: Request, ids: str = ""):
+        await asyncio.sleep(latency)
+        if not authorized(request):
+            return Response(status_code=401)
+        return {"ids": [task_id for task_id in ids.split(",") if task_id]}
+
+    @stub.get("/api/tasks/{task_id}")
+    async def task(request: Request, task_id: str):
+        await asyncio.sleep(latency)
+        if not authorized(request):
+            return Response(status_code=401)
+        return {"id": task_id}
+
+    return stub, calls
+
+
+async def seed(session_factory, task_ids: list[str], per_task: int) -> list[Comment]:
+    async with session_factory() as db:
+        return await CommentRepository.create_comments(
+            db,
+            [
+                CommentCreate(task_id=task_id, user_id=1, content=CONTENT)
+                for task_id in task_ids
+                for _ in range(per_task)
+            ],
+        )
+
+
+async def measure(requests, concurrency: int) -> dict:
+    """
+    Sends the requests with `concurrency` workers; `prepare` runs outside of the timing.
+    """
+    pending = iter(requests)
+    timings = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for prepare, send in pending:
+            if prepare is not None:
+                await prepare()
+            started = time.perf_counter()
+            response = await send()
+            timings.append(time.perf_counter() - started)
+            if response.is_error:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return summarize(timings, rps=round(len(timings) / elapsed, 1), errors=errors)
+
+
+async def run(args) -> dict:
+    settings.DJANGO_BACKEND_URL = "http://django.stub/api/"
+    redis = await get_redis(args.redis_url)
+    engine = create_engine(args.database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def get_benchmark_db():
+        async with session_factory() as session:
+            yield session
+
+    token = make_token()
+    stub, calls = make_django_stub(args.django_latency_ms / 1000, token)
+    app.state.redis = redis
+    app.state.http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub))
+    app.dependency_overrides[get_db] = get_benchmark_db
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://comments.benchmark",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    task_ids = set()
+
+    def make_tasks(name: str, count: int) -> list[str]:
+        tasks = [f"{TASK_PREFIX}{name}-{i}" for i in range(count)]
+        task_ids.update(tasks)
+        return tasks
+
+    list_tasks = make_tasks("list", args.tasks)
+    await seed(session_factory, list_tasks, args.comments_per_task)
+
+    def get_list(task_id: str, cold: bool):
+        async def prepare():
+            await CommentCache.delete_cached_comments_by_task(redis, task_id)
+
+        return (prepare if cold else None), lambda: client.get(f"/comments/{task_id}")
+
+    results = {}
+    try:
+        for concurrency in args.concurrency:
+            write_tasks = make_tasks(f"write-{concurrency}", args.tasks)
+            update_comments = await seed(
+                session_factory,
+                make_tasks(f"update-{concurrency}", args.tasks),
+                args.requests // args.tasks + 1,
+            )
+            delete_comments = await seed(
+                session_factory,
+                make_tasks(f"delete-{concurrency}", args.tasks),
+                args.requests // args.tasks + 1,
+            )
+            bulk_tasks = make_tasks(f"bulk-{concurrency}", args.bulk_tasks)
+            await seed(session_factory, bulk_tasks, args.comments_per_task)
+
+            scenarios = {
+                "list_cold": [
+                    get_list(list_tasks[i % len(list_tasks)], cold=True)
+                    for i in range(args.requests)
+                ],
+                "list_warm": [
+                    get_list(list_tasks[i % len(list_tasks)], cold=False)
+                    for i in range(args.requests)
+                ],
+                "create": [
+                    (
+                        None,
+                        lambda task_id=write_tasks[i % len(write_tasks)]: client.post(
+                            f"/comments/{task_id}",
+                            json={"task_id": task_id, "user_id": 1, "content": CONTENT},
+                        ),
+                    )
+                    for i in range(args.requests)
+                ],
+                "update": [
+                    (
+                        None,
+                        lambda comment=comment: client.put(
+                            f"/comments/{comment.task_id}/{comment.id}",
+                            json={"content": CONTENT.upper()},
+                        ),
+                    )
+                    for comment in update_comments[: args.requests]
+                ],
+                "delete": [
+                    (
+                        None,
+                        lambda comment=comment: client.delete(
+                            f"/comments/{comment.task_id}/{comment.id}"
+                        ),
+                    )
+                    for comment in delete_comments[: args.requests]
+                ],
+                "bulk_delete": [
+                    (None, lambda task_id=task_id: client.delete(f"/comments/{task_id}"))
+                    for task_id in bulk_tasks
+                ],
+            }
+
+            results[concurrency] = {}
+            for name, requests in scenarios.items():
+                calls["count"] = 0
+                stats = await measure(requests, concurrency)
+                results[concurrency][name] = {**stats, "django_calls": calls["count"]}
+    finally:
+        async with session_factory() as db:
+            await db.execute(delete(Comment).where(Comment.task_id.startswith(TASK_PREFIX)))
+            await db.execute(
+                delete(CommentCount).where(CommentCount.task_id.startswith(TASK_PREFIX))
+            )
+            await db.commit()
+        for task_id in task_ids:
+            await CommentCache.delete_cached_comments_by_task(redis, task_id)
+            await CommentCountCache.delete_count(redis, task_id)
+            await OwnershipCache.invalidate_task(redis, task_id)
+        await client.aclose()
+        await app.state.http_client.aclose()
+        await engine.dispose()
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "database": engine.dialect.name,
+            "redis": "redis" if args.redis_url else "fakeredis",
+            "auth_mode": settings.AUTH_MODE,
+            "requests": args.requests,
+            "tasks": args.tasks,
+            "comments_per_task": args.comments_per_task,
+            "django_latency_ms": args.django_latency_ms,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=500, help="per scenario")
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--comments-per-task", type=int, default=50)
+    parser.add_argument("--bulk-tasks", type=int, default=50, help="bulk deletes per level")
+    parser.add_argument("--django-latency-ms", type=float, default=5.0)
+    parser.add_argument("--database-url", default="", help="SQLite file if not set")
+    parser.add_argument("--redis-url", default="", help="fakeredis if not set")
+    parser.add_argument("--output", help="path of the JSON file with the results")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    print("  ".join(f"{k}={v}" for k, v in results["meta"].items()))
+    for concurrency, scenarios in results["results"].items():
+        for name, stats in scenarios.items():
+            print(f"{concurrency:>4} {name:<12} " + "  ".join(f"{k}={v}" for k, v in stats.items()))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
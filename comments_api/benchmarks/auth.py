@@ -0,0 +1,132 @@
+"""
+Per-request overhead of the task ownership check in both auth modes.
+
+The Django API is replaced by an in-process stub with a configurable latency,
+Redis - by fakeredis (or a real server via --redis-url).
+
+Run from the comments_api directory:
+    python -m benchmarks.auth --requests 2000 --django-latency-ms 5
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import get_redis, summarize
+
+import httpx
+import jwt
+from cache.ownership import OwnershipCache
+from dependencies.auth import JWT_AUTH, REMOTE_AUTH, check_task_ownership
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from settings import settings
+
+OWNED_TASK = "owned"
+
+
+def make_token(user_id: int = 1, lifetime: int = 3600) -> str:
+    now = int(time.time())
+    payload = {
+        "token_type": "access",
+        "exp": now + lifetime,
+        "iat": now,
+        "jti": "benchmark",
+        settings.JWT_USER_ID_CLAIM: str(user_id),
+    }
+    return jwt.encode(payload, settings.JWT_SIGNING_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+def make_django_stub(latency: float, valid_token: str):
+    calls = {"count": 0}
+
+    async def handler(request: httpx.Request):
+        calls["count"] += 1
+        await asyncio.sleep(latency)
+        if request.headers["Authorization"] != f"Bearer {valid_token}":
+            return httpx.Response(401)
+        return httpx.Response(200, json={"id": request.url.path.rsplit("/", 1)[-1]})
+
+    return httpx.MockTransport(handler), calls
+
+
+async def measure(check, requests: int) -> list[float]:
+    timings = []
+    for i in range(requests):
+        started = time.perf_counter()
+        try:
+            await check(i)
+        except HTTPException:
+            pass
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+async def run(args) -> dict:
+    redis = await get_redis(args.redis_url)
+    token = make_token()
+    transport, calls = make_django_stub(args.django_latency_ms / 1000, token)
+    client = httpx.AsyncClient(transport=transport)
+
+    valid = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    invalid = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token + "x")
+
+    async def cold(i):
+        await check_task_ownership(f"cold-{settings.AUTH_MODE}-{i}", valid, redis, client)
+
+    async def warm_redis(i):
+        OwnershipCache._local.delete_where(lambda key: True)
+        await check_task_ownership(OWNED_TASK, valid, redis, client)
+
+    async def warm_local(i):
+        await check_task_ownership(OWNED_TASK, valid, redis, client)
+
+    async def bad_token(i):
+        await check_task_ownership(f"bad-{i}", invalid, redis, client)
+
+    scenarios = {
+        "cold": cold,
+        "warm_redis": warm_redis,
+        "warm_local": warm_local,
+        "invalid_token": bad_token,
+    }
+
+    results = {}
+    for mode in (REMOTE_AUTH, JWT_AUTH):
+        settings.AUTH_MODE = mode
+        await redis.flushdb()
+        OwnershipCache._local.delete_where(lambda key: True)
+        await warm_local(0)
+
+        results[mode] = {}
+        for name, check in scenarios.items():
+            calls["count"] = 0
+            timings = await measure(check, args.requests)
+            results[mode][name] = summarize(timings, django_calls=calls["count"])
+
+    await client.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--django-latency-ms", type=float, default=5.0)
+    parser.add_argument("--redis-url", default="", help="fakeredis if not set")
+    parser.add_argument("--output", help="path of the JSON file with the results")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    for mode, scenarios in results.items():
+        for name, stats in scenarios.items():
+            print(f"{mode:<7} {name:<14} " + "  ".join(f"{k}={v}" for k, v in stats.items()))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
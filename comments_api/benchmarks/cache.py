@@ -0,0 +1,83 @@
+"""
+Cold-read latency of the comment cache: per-comment write-back vs bulk write-back.
+
+The database is replaced by in-memory `Comment` rows, Redis - by fakeredis
+(or a real server via --redis-url, which shows the cost of the round trips).
+
+Run from the comments_api directory:
+    python -m benchmarks.cache --sizes 10 100 300 1000 --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import get_redis, make_comments, summarize
+
+from cache.comments import CommentCache
+from schemas.comment import CommentResponse
+from settings import settings
+
+
+async def per_comment_write_back(redis, task_id: str, comments):
+    # The write-back before the bulk path: HSET + EXPIRE round trips per comment
+    for comment in comments:
+        comment_dict = CommentResponse.model_validate(comment).model_dump(mode="json")
+        await redis.hset(f"task:{task_id}:comments", comment.id, json.dumps(comment_dict))
+        await redis.expire(f"task:{task_id}:comments", settings.REDIS_TIMEOUT)
+
+
+async def bulk_write_back(redis, task_id: str, comments):
+    await CommentCache.cache_comments(redis, task_id, comments)
+
+
+async def cold_read(redis, task_id: str, comments, write_back):
+    await CommentCache.delete_cached_comments_by_task(redis, task_id)
+    started = time.perf_counter()
+    if await CommentCache.get_cached_comments(redis, task_id) is None:
+        await write_back(redis, task_id, comments)
+    return time.perf_counter() - started
+
+
+async def run(args) -> dict:
+    redis = await get_redis(args.redis_url)
+    strategies = {"per_comment": per_comment_write_back, "bulk": bulk_write_back}
+
+    results = {}
+    for size in args.sizes:
+        task_id = f"benchmark-{size}"
+        comments = make_comments(task_id, size)
+        results[size] = {}
+        for name, write_back in strategies.items():
+            timings = [
+                await cold_read(redis, task_id, comments, write_back)
+                for _ in range(args.repeat)
+            ]
+            results[size][name] = summarize(timings)
+        await CommentCache.delete_cached_comments_by_task(redis, task_id)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 300, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--redis-url", default="", help="fakeredis if not set")
+    parser.add_argument("--output", help="path of the JSON file with the results")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    for size, strategies in results.items():
+        for name, stats in strategies.items():
+            print(f"{size:>6} {name:<12} " + "  ".join(f"{k}={v}" for k, v in stats.items()))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Micro-benchmarks of the warm read path of the comment list.
+
+For each list size compares:
+- legacy: HGETALL + json.loads + model_validate per comment, then the
+  response_model re-validation and serialization done by FastAPI;
+- models: cached comments parsed into `CommentResponse` and serialized
+  through `CommentsResponse`;
+- raw: cached JSON joined into the response without Pydantic models.
+The `cpu_*` variants run on payloads already fetched from Redis, which
+isolates the (de)serialization cost.
+
+Run from the comments_api directory:
+    python -m benchmarks.cache_read --sizes 10 100 1000 --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import get_redis, make_comments, summarize
+
+from cache.comments import CommentCache
+from schemas.comment import CommentResponse, CommentsResponse
+from services.comments import CommentService
+
+
+def legacy_response(cached: dict) -> bytes:
+    comments = [
+        CommentResponse.model_validate(json.loads(value.encode("utf-8")))
+        for value in cached.values()
+    ]
+    return CommentsResponse.model_validate({"comments": comments}).model_dump_json()
+
+
+def models_response(payloads: list) -> bytes:
+    comments = CommentCache.parse_comments(payloads)
+    return CommentsResponse.model_validate({"comments": comments}).model_dump_json()
+
+
+def raw_response(payloads: list) -> bytes:
+    return ('{"comments":[' + ",".join(payloads) + '],"next_cursor":null}').encode()
+
+
+async def run(args) -> dict:
+    redis = await get_redis(args.redis_url)
+
+    results = {}
+    for size in args.sizes:
+        task_id = f"benchmark-{size}"
+        legacy_key = f"benchmark-legacy:{task_id}"
+        comments = make_comments(task_id, size)
+
+        await CommentCache.cache_comments(redis, task_id, comments)
+        await redis.hset(
+            legacy_key,
+            mapping={
+                comment.id: json.dumps(
+                    CommentResponse.model_validate(comment).model_dump(mode="json")
+                )
+                for comment in comments
+            },
+        )
+        cached = await redis.hgetall(legacy_key)
+        payloads, _ = await CommentCache.get_cached_payloads_with_ttl(redis, task_id)
+
+        async def legacy():
+            legacy_response(await redis.hgetall(legacy_key))
+
+        async def models():
+            payloads, _ = await CommentCache.get_cached_payloads_with_ttl(redis, task_id)
+            models_response(payloads)
+
+        async def raw():
+            await CommentService.get_comments_json(None, redis, task_id)
+
+        async def cpu_legacy():
+            legacy_response(cached)
+
+        async def cpu_models():
+            models_response(payloads)
+
+        async def cpu_raw():
+            raw_response(payloads)
+
+        scenarios = {
+            "legacy": legacy,
+            "models": models,
+            "raw": raw,
+            "cpu_legacy": cpu_legacy,
+            "cpu_models": cpu_models,
+            "cpu_raw": cpu_raw,
+        }
+
+        results[size] = {}
+        for name, scenario in scenarios.items():
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                await scenario()
+                timings.append(time.perf_counter() - started)
+            results[size][name] = summarize(timings)
+
+        await CommentCache.delete_cached_comments_by_task(redis, task_id)
+        await redis.delete(legacy_key)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--redis-url", default="", help="fakeredis if not set")
+    parser.add_argument("--output", help="path of the JSON file with the results")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    for size, scenarios in results.items():
+        for name, stats in scenarios.items():
+            print(f"{size:>6} {name:<12} " + "  ".join(f"{k}={v}" for k, v in stats.items()))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
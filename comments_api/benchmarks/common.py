@@ -0,0 +1,117 @@
+"""
+Shared setup of the benchmark scripts.
+
+Importing this module fills in the settings required by `settings.Settings`,
+so the benchmarks can run without the service's env file.
+"""
+
+import os
+import statistics
+import subprocess
+
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("DB_NAME", "benchmark")
+os.environ.setdefault("DB_PASSWORD", "benchmark")
+os.environ.setdefault("REDIS_HOST", "localhost")
+os.environ.setdefault("REDIS_PORT", "6379")
+os.environ.setdefault("REDIS_TIMEOUT", "3600")
+os.environ.setdefault("DJANGO_BACKEND_URL", "http://django.stub/api/")
+os.environ.setdefault("JWT_SIGNING_KEY", "benchmark-signing-key-of-at-least-32-bytes")
+
+
+async def get_redis(url: str = ""):
+    """
+    Returns a Redis client for the given URL, or fakeredis if no URL is given.
+    """
+    if url:
+        import redis.asyncio as redis
+
+        return redis.from_url(url, decode_responses=True)
+
+    import fakeredis
+
+    return fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+
+def make_comments(task_id: str, count: int) -> list:
+    """
+    Returns `count` unsaved comments of the task, one second apart.
+    """
+    import datetime
+
+    from models.comment import Comment
+
+    created_at = datetime.datetime(2025, 1, 1)
+    return [
+        Comment(
+            id=i,
+            task_id=task_id,
+            user_id=1,
+            content=f"Comment #{i} " + "lorem ipsum " * 10,
+            created_at=created_at + datetime.timedelta(seconds=i),
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def create_engine(url: str = ""):
+    """
+    Returns an async engine for the given database URL, or a temporary SQLite file
+    with the Postgres-only parts of the schema emulated if no URL is given.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    if url:
+        return create_async_engine(url, pool_size=20, max_overflow=20)
+
+    import tempfile
+
+    from sqlalchemy.dialects.postgresql import TSVECTOR
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(TSVECTOR, "sqlite")
+    def compile_tsvector(type_, compiler, **kw):
+        return "TEXT"
+
+    path = tempfile.NamedTemporaryFile(prefix="benchmark-", suffix=".sqlite3").name
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}", connect_args={"timeout": 30}
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def register_functions(connection, record):
+        connection.create_function(
+            "to_tsvector", 2, lambda config, text: text, deterministic=True
+        )
+
+    return engine
+
+
+def git_revision() -> str:
+    """
+    Returns the commit the benchmark runs on, to tell the results apart.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def summarize(timings: list[float], **extra) -> dict:
+    """
+    Returns mean / p50 / p99 of the timings (in seconds) in microseconds.
+    """
+    timings_us = sorted(t * 1e6 for t in timings)
+    return {
+        "mean_us": round(statistics.fmean(timings_us), 1),
+        "p50_us": round(timings_us[len(timings_us) // 2], 1),
+        "p99_us": round(timings_us[max(int(len(timings_us) * 0.99) - 1, 0)], 1),
+        **extra,
+    }
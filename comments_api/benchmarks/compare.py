@@ -0,0 +1,84 @@
+"""
+Comparison of two JSON results of the same benchmark, e.g. before and after a commit.
+
+Every measurement present in both files is printed with the relative change
+of its latency percentiles and throughput. Exits with status 1 if any of them
+regressed by more than --threshold percent, so it can gate a CI job.
+
+Run from the comments_api directory:
+    python -m benchmarks.compare old.json new.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+
+# Metric -> whether a higher value is better
+METRICS = {"p50_us": False, "p99_us": False, "rps": True}
+
+
+def measurements(results: dict, path: tuple = ()):
+    """
+    Yields (path, stats) for every `summarize` result nested in the benchmark output.
+    """
+    for key, value in results.items():
+        if not isinstance(value, dict):
+            continue
+        if "p50_us" in value:
+            yield path + (key,), value
+        else:
+            yield from measurements(value, path + (key,))
+
+
+def compare(old: dict, new: dict, threshold: float) -> tuple[list[str], int]:
+    old_measurements = dict(measurements(old))
+    lines = []
+    regressions = 0
+    for path, new_stats in measurements(new):
+        old_stats = old_measurements.get(path)
+        if old_stats is None:
+            continue
+
+        changes = []
+        for metric, higher_is_better in METRICS.items():
+            if not old_stats.get(metric) or metric not in new_stats:
+                continue
+            change = (new_stats[metric] - old_stats[metric]) / old_stats[metric] * 100
+            regressed = (-change if higher_is_better else change) > threshold
+            regressions += regressed
+            changes.append(
+                f"{metric}={old_stats[metric]}->{new_stats[metric]} "
+                f"({change:+.1f}%{' REGRESSION' if regressed else ''})"
+            )
+        lines.append(f"{'/'.join(path):<32} " + "  ".join(changes))
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("old", help="JSON results of the baseline run")
+    parser.add_argument("new", help="JSON results of the run to check")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="allowed regression, percent"
+    )
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    for name, results in (("old", old), ("new", new)):
+        revision = results.get("meta", {}).get("revision")
+        if revision:
+            print(f"{name}: {revision}")
+
+    lines, regressions = compare(old, new, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"{regressions} regression(s) over {args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
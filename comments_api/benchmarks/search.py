@@ -0,0 +1,170 @@
+"""
+Latency of the full-text search over a large synthetic set of comments.
+
+Needs a PostgreSQL database migrated to the latest revision: the rows are
+generated on the server with generate_series and removed afterwards
+(unless --keep). For each query compares:
+- search: `websearch_to_tsquery` over the GIN-indexed `search_vector`;
+- ilike: the `content ILIKE '%word%'` scan it replaces.
+
+Run from the comments_api directory:
+    python -m benchmarks.search --rows 1000000 --database-url postgresql+asyncpg://...
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks.common import summarize
+
+from models.comment import Comment
+from repositories.comments import CommentRepository
+from settings import settings
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+TASK_PREFIX = "benchmark-search-"
+
+WORDS = [
+    "задача", "срок", "исправить", "ошибка", "тест", "релиз", "сервер", "база",
+    "кеш", "запрос", "пользователь", "документация", "ревью", "деплой", "миграция",
+    "индекс", "отчёт", "встреча", "дизайн", "клиент", "bug", "deploy", "review",
+    "release", "backend", "frontend", "latency", "timeout", "postgres", "redis",
+]
+# One rare word per ~1000 comments, to measure selective queries
+RARE_WORD = "квазар"
+
+QUERIES = {
+    "common": "ошибка",
+    "two_words": "ошибка сервер",
+    "phrase": '"исправить ошибка"',
+    "rare": RARE_WORD,
+}
+
+
+async def populate(db: AsyncSession, rows: int, tasks: int):
+    await db.execute(
+        text(
+            """
+            INSERT INTO fastapi_comments (task_id, user_id, content)
+            SELECT
+                CAST(:prefix AS text) || (i % :tasks),
+                1 + i % 1000,
+                array_to_string(
+                    ARRAY(
+                        SELECT CAST(:words AS text[])[1 + floor(random() * :word_count)::int]
+                        FROM generate_series(1, 8 + i % 8)
+                    ),
+                    ' '
+                ) || CASE WHEN i % 1000 = 0 THEN ' ' || CAST(:rare AS text) ELSE '' END
+            FROM generate_series(1, :rows) AS i
+            """
+        ),
+        {
+            "prefix": TASK_PREFIX,
+            "tasks": tasks,
+            "words": WORDS,
+            "word_count": len(WORDS),
+            "rare": RARE_WORD,
+            "rows": rows,
+        },
+    )
+    await db.commit()
+    await db.execute(text("ANALYZE fastapi_comments"))
+
+
+async def ilike_search(db: AsyncSession, task_ids: list[str], word: str, limit: int):
+    result = await db.execute(
+        select(Comment)
+        .where(Comment.task_id.in_(task_ids), Comment.content.ilike(f"%{word}%"))
+        .order_by(Comment.id.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def run(args) -> dict:
+    engine = create_async_engine(args.database_url or settings.DATABASE_URL)
+    results = {}
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        await db.execute(delete(Comment).where(Comment.task_id.startswith(TASK_PREFIX)))
+        started = time.perf_counter()
+        await populate(db, args.rows, args.tasks)
+        results["populate_s"] = round(time.perf_counter() - started, 1)
+        results["rows"] = await db.scalar(
+            select(func.count()).where(Comment.task_id.startswith(TASK_PREFIX))
+        )
+
+        try:
+            for scope in args.scopes:
+                results[scope] = {}
+                for name, query in QUERIES.items():
+                    word = query.strip('"').split()[0]
+                    scenarios = {
+                        "search": lambda task_ids: CommentRepository.search_comments(
+                            db, task_ids, query, args.limit
+                        ),
+                        "ilike": lambda task_ids: ilike_search(
+                            db, task_ids, word, args.limit
+                        ),
+                    }
+                    for scenario, search in scenarios.items():
+                        timings = []
+                        found = 0
+                        for _ in range(args.repeat):
+                            task_ids = [
+                                f"{TASK_PREFIX}{i}"
+                                for i in random.sample(range(args.tasks), scope)
+                            ]
+                            started = time.perf_counter()
+                            found += len(await search(task_ids))
+                            timings.append(time.perf_counter() - started)
+                        results[scope][f"{name}_{scenario}"] = summarize(
+                            timings, found_avg=round(found / args.repeat, 1)
+                        )
+        finally:
+            if not args.keep:
+                await db.execute(
+                    delete(Comment).where(Comment.task_id.startswith(TASK_PREFIX))
+                )
+                await db.commit()
+
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument(
+        "--scopes",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="numbers of the user's tasks to search in",
+    )
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", default="", help="DATABASE_URL if not set")
+    parser.add_argument("--keep", action="store_true", help="keep the generated rows")
+    parser.add_argument("--output", help="path of the JSON file with the results")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    print(f"rows={results['rows']} populate_s={results['populate_s']}")
+    for scope in args.scopes:
+        for name, stats in results[scope].items():
+            print(f"{scope:>6} {name:<18} " + "  ".join(f"{k}={v}" for k, v in stats.items()))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,150 @@
-import json
-import redis.asyncio as redis
-from schemas.comment import CommentResponse
+import asyncio
+import time
+
+from pydantic import ValidationError
+from redis.exceptions import WatchError
+from schemas.comment import CommentListAdapter, CommentResponse
 from settings import settings
 
+# Reads a range of the ordered comments: KEYS = order, payloads, empty marker;
+# ARGV = member to start after ('' for the beginning), count (-1 for all).
+# Returns nil on a miss, otherwise {TTL in ms, payload, ...}.
+READ_RANGE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    local empty_ttl = redis.call('PTTL', KEYS[3])
+    if empty_ttl == -2 then
+        return false
+    end
+    return {empty_ttl}
+end
+
+local start = 0
+if ARGV[1] ~= '' then
+    local rank = redis.call('ZRANK', KEYS[1], ARGV[1])
+    if not rank then
+        return false
+    end
+    start = rank + 1
+end
+
+local stop = -1
+if tonumber(ARGV[2]) >= 0 then
+    stop = start + tonumber(ARGV[2]) - 1
+end
+
+local result = {redis.call('PTTL', KEYS[1])}
+local members = redis.call('ZRANGE', KEYS[1], start, stop)
+for offset = 1, #members, 1000 do
+    local fields = {}
+    for i = offset, math.min(offset + 999, #members) do
+        fields[#fields + 1] = tostring(tonumber(members[i]))
+    end
+    local payloads = redis.call('HMGET', KEYS[2], unpack(fields))
+    for i = 1, #payloads do
+        result[#result + 1] = payloads[i]
+    end
+end
+return result
+"""
+
+# Reads the number of comments and the latest ones: KEYS = order, payloads,
+# empty marker; ARGV = count of the latest comments.
+# Returns nil on a miss, otherwise {number of comments, payload, ...}.
+READ_LATEST_SCRIPT = """
+local total = redis.call('ZCARD', KEYS[1])
+if total == 0 then
+    if redis.call('EXISTS', KEYS[3]) == 0 then
+        return false
+    end
+    return {0}
+end
+
+local result = {total}
+local count = tonumber(ARGV[1])
+if count > 0 then
+    local members = redis.call('ZRANGE', KEYS[1], -count, -1)
+    local fields = {}
+    for i = 1, #members do
+        fields[i] = tostring(tonumber(members[i]))
+    end
+    local payloads = redis.call('HMGET', KEYS[2], unpack(fields))
+    for i = 1, #payloads do
+        result[#result + 1] = payloads[i]
+    end
+end
+return result
+"""
+
+# Adds a comment only to a cached list, so that a partial list is never cached,
+# and bumps the generation of the comments of the task in any case:
+# KEYS = order, payloads, empty marker, generation; ARGV = member, score, id,
+# payload, TTL.
+WRITE_ONE_SCRIPT = """
+redis.call('INCR', KEYS[4])
+redis.call('EXPIRE', KEYS[4], ARGV[5])
+if redis.call('EXISTS', KEYS[1]) == 1 or redis.call('DEL', KEYS[3]) == 1 then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+    redis.call('HSET', KEYS[2], ARGV[3], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    redis.call('EXPIRE', KEYS[2], ARGV[5])
+    return 1
+end
+return 0
+"""
+
 
 class CommentCache:
     """
     Class for working with caching comments in Redis.
+
+    Comments of a task are kept in two keys with the same TTL:
+    - `task:{task_id}:comments:order` - sorted set of the comment ids ordered
+      by (created_at, id), which allows to read a page by rank;
+    - `task:{task_id}:comments` - hash comment id -> compact comment JSON in
+      the shape of `CommentResponse`, so it can be sent to clients as is.
+    The sorted set exists only while the full list of the task is cached.
+    A task known to have no comments is marked with the
+    `task:{task_id}:comments:empty` key, which lives `COMMENTS_EMPTY_CACHE_TTL`
+    seconds and is removed as soon as a comment is cached for the task.
+
+    Every change of the comments increments `task:{task_id}:comments:generation`,
+    even if they are not cached. A rebuild reads the generation before loading
+    the comments and drops its result if the generation has changed since, so a
+    list loaded before a concurrent change never replaces the cached one.
+
+    Hashes written by the previous layout have no sorted set, so they are
+    read as a miss and replaced by the next rebuild of the task.
     """
 
     @staticmethod
-    async def get_redis():
-        """
-        Creates a connection to Redis.
+    def _keys(task_id: str) -> list[str]:
+        return [
+            f"task:{task_id}:comments:order",
+            f"task:{task_id}:comments",
+            f"task:{task_id}:comments:empty",
+        ]
 
-        Returns:
-            REDIS: Client Object Redis.
-        """
-        return await redis.from_url(settings.REDIS_URL, decode_responses=True)
+    @staticmethod
+    def _generation_key(task_id: str) -> str:
+        return f"task:{task_id}:comments:generation"
+
+    @staticmethod
+    def _write_one_keys(task_id: str) -> list[str]:
+        return [*CommentCache._keys(task_id), CommentCache._generation_key(task_id)]
+
+    @staticmethod
+    def _member(comment_id: int) -> str:
+        # Zero-padded, so that comments created at the same time are ordered by id
+        return f"{int(comment_id):010d}"
+
+    @staticmethod
+    def _score(created_at) -> float:
+        return created_at.timestamp()
 
     @staticmethod
     async def cache_comment(redis, task_id: str, comment_id: int, comment_data):
         """
-        Cache the comment for the specified task in Redis.
+        Cache the comment for the specified task in Redis, if the comments of the task are cached.
 
         Args:
             REDIS (REDIS): an object of a client of a client.
@@ -30,15 +152,116 @@ class CommentCache:
             Comment_id (int): Comment identifier.
             Comment_Data (DICT): Comment for caching.
         """
-        comment_dict = CommentResponse.model_validate(comment_data).model_dump(
-            mode='json'
-        )
+        comment = CommentResponse.model_validate(comment_data)
 
-        await redis.hset(
-            f"task:{task_id}:comments", comment_id, json.dumps(comment_dict)
+        await redis.register_script(WRITE_ONE_SCRIPT)(
+            keys=CommentCache._write_one_keys(task_id),
+            args=CommentCache._write_one_args(comment_id, comment),
         )
 
-        await redis.expire(f"task:{task_id}:comments", settings.REDIS_TIMEOUT)
+    @staticmethod
+    async def cache_new_comments(redis, comments):
+        """
+        Cache the new comments of any tasks with a single round trip.
+
+        As with `cache_comment`, a comment is added only to the tasks whose comments are cached.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            Comments (list): Comments for caching.
+        """
+        write_one = redis.register_script(WRITE_ONE_SCRIPT)
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for comment in CommentListAdapter.validate_python(
+                comments, from_attributes=True
+            ):
+                await write_one(
+                    keys=CommentCache._write_one_keys(comment.task_id),
+                    args=CommentCache._write_one_args(comment.id, comment),
+                    client=pipe,
+                )
+            await pipe.execute()
+
+    @staticmethod
+    def _write_one_args(comment_id: int, comment: CommentResponse) -> list:
+        return [
+            CommentCache._member(comment_id),
+            CommentCache._score(comment.created_at),
+            comment_id,
+            comment.model_dump_json(),
+            settings.REDIS_TIMEOUT,
+        ]
+
+    @staticmethod
+    async def get_generation(redis, task_id: str):
+        """
+        Receives the generation of the comments of the task, to be passed to `cache_comments`.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            TASK_ID (str): the identifier of the task.
+
+        Returns:
+            str: the generation, "0" if the comments have not changed recently.
+        """
+        return await redis.get(CommentCache._generation_key(task_id)) or "0"
+
+    @staticmethod
+    async def cache_comments(redis, task_id: str, comments, generation=None) -> bool:
+        """
+        Cache the full list of comments for the specified task with a single round trip.
+
+        The list is validated and serialized in one pass and replaces the
+        cached one in a single transaction. An empty list is cached as the
+        "no comments" marker.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            TASK_ID (str): the identifier of the task.
+            Comments (list): Comments for caching.
+            generation (str): result of `get_generation` read before the
+                comments were loaded, the list is not cached if the comments
+                have changed since. None caches the list unconditionally.
+
+        Returns:
+            bool: True if the list has been cached.
+        """
+        order_key, comments_key, empty_key = CommentCache._keys(task_id)
+        generation_key = CommentCache._generation_key(task_id)
+
+        if comments:
+            validated = CommentListAdapter.validate_python(
+                comments, from_attributes=True
+            )
+            payloads = {comment.id: comment.model_dump_json() for comment in validated}
+            order = {
+                CommentCache._member(comment.id): CommentCache._score(comment.created_at)
+                for comment in validated
+            }
+
+        async with redis.pipeline(transaction=True) as pipe:
+            if generation is not None:
+                # Nothing is written if the generation changes before the transaction
+                await pipe.watch(generation_key)
+                if (await pipe.get(generation_key) or "0") != generation:
+                    return False
+                pipe.multi()
+
+            if comments:
+                pipe.delete(order_key, comments_key, empty_key)
+                pipe.hset(comments_key, mapping=payloads)
+                pipe.zadd(order_key, order)
+                pipe.expire(comments_key, settings.REDIS_TIMEOUT)
+                pipe.expire(order_key, settings.REDIS_TIMEOUT)
+            else:
+                pipe.delete(order_key, comments_key)
+                pipe.set(empty_key, 1, ex=settings.COMMENTS_EMPTY_CACHE_TTL)
+            try:
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
 
     @staticmethod
     async def get_cached_comments(redis, task_id: str):
@@ -50,26 +273,163 @@ class CommentCache:
             TASK_ID (str): the identifier of the task.
 
         Returns:
-            dict: a dictionary with cache comments (Comment_id -> Commentresponse, or None if the comments have not been found.
+            list: cache comments (Commentresponse) ordered by (created_at, id), empty if the task is known to have no comments, or None if the comments have not been found.
         """
-        cached_comments = await redis.hgetall(f"task:{task_id}:comments")
+        cached_comments, _ = await CommentCache.get_cached_comments_with_ttl(
+            redis, task_id
+        )
+        return cached_comments
 
-        if not cached_comments:
+    @staticmethod
+    async def get_cached_comments_with_ttl(redis, task_id: str):
+        """
+        Receives all the cache comments for the specified task and the remaining lifetime of the cache.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            TASK_ID (str): the identifier of the task.
+
+        Returns:
+            tuple: cache comments as in `get_cached_comments` and the TTL in seconds (negative if there is no TTL).
+        """
+        payloads, ttl = await CommentCache.get_cached_payloads_with_ttl(
+            redis, task_id
+        )
+        return CommentCache.parse_comments(payloads), ttl
+
+    @staticmethod
+    async def get_cached_payloads_with_ttl(redis, task_id: str):
+        """
+        Receives the JSON of all the cache comments for the specified task without parsing it.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            TASK_ID (str): the identifier of the task.
+
+        Returns:
+            tuple: list of comment JSON strings ordered by (created_at, id) (None if the comments have not been found) and the TTL in seconds.
+        """
+        return await CommentCache._read_range(redis, task_id, None, -1)
+
+    @staticmethod
+    async def get_cached_page(redis, task_id: str, after_id: int, count: int):
+        """
+        Receives a page of the cache comments for the specified task.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            TASK_ID (str): the identifier of the task.
+            after_id (int): ID of the comment the page starts after, None for the first page.
+            count (int): maximum number of comments on the page.
+
+        Returns:
+            list: cache comments ordered by (created_at, id), or None if the comments of the task or the `after_id` comment are not cached.
+        """
+        payloads, _ = await CommentCache._read_range(redis, task_id, after_id, count)
+        return CommentCache.parse_comments(payloads)
+
+    @staticmethod
+    async def get_cached_latest(redis, task_ids: list[str], count: int) -> dict:
+        """
+        Receives the number of comments and the latest comments of several tasks with one round trip.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            task_ids (list [str]): identifiers of the tasks.
+            count (int): number of the latest comments per task.
+
+        Returns:
+            dict: task ID -> (number of comments, latest comments ordered by (created_at, id)), only for the tasks whose comments are cached.
+        """
+        read_latest = redis.register_script(READ_LATEST_SCRIPT)
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for task_id in task_ids:
+                await read_latest(
+                    keys=CommentCache._keys(task_id), args=[count], client=pipe
+                )
+            results = await pipe.execute()
+
+        cached = {}
+        for task_id, result in zip(task_ids, results):
+            if result is None or None in result:
+                continue
+            cached[task_id] = (int(result[0]), CommentCache.parse_comments(result[1:]))
+        return cached
+
+    @staticmethod
+    async def _read_range(redis, task_id: str, after_id: int, count: int):
+        result = await redis.register_script(READ_RANGE_SCRIPT)(
+            keys=CommentCache._keys(task_id),
+            args=[
+                CommentCache._member(after_id) if after_id is not None else "",
+                count,
+            ],
+        )
+        if result is None:
+            return None, -1
+
+        ttl_ms, *payloads = result
+        return [payload for payload in payloads if payload], ttl_ms / 1000
+
+    @staticmethod
+    def parse_comments(payloads: list):
+        """
+        Turns the cached comment JSON strings into `CommentResponse` objects.
+
+        Returns:
+            list: parsed comments, or None if `payloads` is None.
+        """
+        if payloads is None:
             return None
 
-        parsed_comments = {}
-        for key, value in cached_comments.items():
-            if value:
-                try:
-                    data = json.loads(value.encode('utf-8'))
-                    parsed_comments[key] = CommentResponse.model_validate(data)
-                except json.JSONDecodeError:
-                    print(f"Ошибка при декодировании JSON для ключа {key}")
-            else:
-                print(f"Пустое значение для ключа {key}")
+        parsed_comments = []
+        for value in payloads:
+            try:
+                parsed_comments.append(CommentResponse.model_validate_json(value))
+            except ValidationError:
+                print(f"Ошибка при декодировании JSON комментария: {value}")
 
         return parsed_comments
 
+    @staticmethod
+    def rebuild_lock(redis, task_id: str):
+        """
+        Returns the lock that guards the rebuilding of the task comments cache across workers.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            TASK_ID (str): the identifier of the task.
+
+        Returns:
+            Lock: non-blocking Redis lock with a short lease.
+        """
+        return redis.lock(
+            f"task:{task_id}:comments:lock",
+            timeout=settings.COMMENTS_LOCK_TIMEOUT,
+            blocking=False,
+        )
+
+    @staticmethod
+    async def wait_for_rebuild(redis, task_id: str):
+        """
+        Waits until another worker releases the rebuild lock of the task, but no longer than `COMMENTS_LOCK_WAIT`.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            TASK_ID (str): the identifier of the task.
+
+        Returns:
+            list: cache comments as in `get_cached_comments`.
+        """
+        deadline = time.monotonic() + settings.COMMENTS_LOCK_WAIT
+        while time.monotonic() < deadline:
+            if not await redis.exists(f"task:{task_id}:comments:lock"):
+                break
+            await asyncio.sleep(settings.COMMENTS_LOCK_POLL_INTERVAL)
+
+        return await CommentCache.get_cached_comments(redis, task_id)
+
     @staticmethod
     async def delete_cached_comment(redis, task_id: str, comment_id: int):
         """
@@ -80,7 +440,13 @@ class CommentCache:
             TASK_ID (str): the identifier of the task.
             Comment_id (int): Comment identifier for deleting.
         """
-        await redis.hdel(f"task:{task_id}:comments", comment_id)
+        order_key, comments_key, _ = CommentCache._keys(task_id)
+
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(order_key, CommentCache._member(comment_id))
+            pipe.hdel(comments_key, comment_id)
+            CommentCache._bump_generation(pipe, task_id)
+            await pipe.execute()
 
     @staticmethod
     async def delete_cached_comments_by_task(redis, task_id: str):
@@ -91,4 +457,13 @@ class CommentCache:
             REDIS (REDIS): an object of a client of a client.
             TASK_ID (str): the identifier of the task.
         """
-        await redis.delete(f"task:{task_id}:comments")
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.delete(*CommentCache._keys(task_id))
+            CommentCache._bump_generation(pipe, task_id)
+            await pipe.execute()
+
+    @staticmethod
+    def _bump_generation(pipe, task_id: str):
+        generation_key = CommentCache._generation_key(task_id)
+        pipe.incr(generation_key)
+        pipe.expire(generation_key, settings.REDIS_TIMEOUT)
@@ -0,0 +1,128 @@
+from settings import settings
+
+# Caches the numbers of comments loaded from the database, skipping the tasks
+# whose comments have changed since: KEYS = counters hash, generation of each
+# task; ARGV = task_id, count, generation read before the load, ...
+SET_COUNTS_SCRIPT = """
+for i = 2, #KEYS do
+    local arg = (i - 2) * 3
+    local generation = redis.call('GET', KEYS[i]) or '0'
+    if generation == ARGV[arg + 3] then
+        redis.call('HSET', KEYS[1], ARGV[arg + 1], ARGV[arg + 2])
+    end
+end
+return 1
+"""
+
+
+class CommentCountCache:
+    """
+    Class for caching the number of comments of the tasks in Redis.
+
+    All the counters are fields of the `comments:counts` hash: task ID -> number
+    of comments. A missing field is loaded from the `fastapi_comment_counts`
+    table. A change of the comments of a task removes its field and increments
+    `task:{task_id}:comments:count:generation`, and a loaded number is cached
+    only if the generation has not changed during the load, so a number read
+    before a concurrent change is never cached.
+    """
+
+    KEY = "comments:counts"
+
+    @staticmethod
+    def _generation_key(task_id: str) -> str:
+        return f"task:{task_id}:comments:count:generation"
+
+    @staticmethod
+    async def get_counts(redis, task_ids: list[str]) -> dict:
+        """
+        Receives the cached numbers of comments of the tasks.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            task_ids (list [str]): identifiers of the tasks.
+
+        Returns:
+            dict: task ID -> number of comments, only for the cached counters.
+        """
+        counts = await redis.hmget(CommentCountCache.KEY, task_ids)
+        return {
+            task_id: int(count)
+            for task_id, count in zip(task_ids, counts)
+            if count is not None
+        }
+
+    @staticmethod
+    async def get_generations(redis, task_ids: list[str]) -> dict:
+        """
+        Receives the generations of the counters, to be read before the numbers are loaded.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            task_ids (list [str]): identifiers of the tasks.
+
+        Returns:
+            dict: task ID -> generation, "0" if the comments have not changed recently.
+        """
+        generations = await redis.mget(
+            [CommentCountCache._generation_key(task_id) for task_id in task_ids]
+        )
+        return {
+            task_id: generation or "0"
+            for task_id, generation in zip(task_ids, generations)
+        }
+
+    @staticmethod
+    async def set_counts(redis, counts: dict, generations: dict):
+        """
+        Caches the numbers of comments loaded from the database, unless the comments have changed since.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            counts (dict): task ID -> number of comments.
+            generations (dict): task ID -> generation read by `get_generations` before the load.
+        """
+        if not counts:
+            return
+
+        keys = [CommentCountCache.KEY] + [
+            CommentCountCache._generation_key(task_id) for task_id in counts
+        ]
+        args = [
+            value
+            for task_id, count in counts.items()
+            for value in (task_id, count, generations[task_id])
+        ]
+        await redis.register_script(SET_COUNTS_SCRIPT)(keys=keys, args=args)
+
+    @staticmethod
+    async def delete_counts(redis, task_ids):
+        """
+        Removes the cached numbers of comments of the tasks after a change of their comments.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            task_ids (Iterable [str]): identifiers of the tasks.
+        """
+        task_ids = list(task_ids)
+        if not task_ids:
+            return
+
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hdel(CommentCountCache.KEY, *task_ids)
+            for task_id in task_ids:
+                generation_key = CommentCountCache._generation_key(task_id)
+                pipe.incr(generation_key)
+                pipe.expire(generation_key, settings.REDIS_TIMEOUT)
+            await pipe.execute()
+
+    @staticmethod
+    async def delete_count(redis, task_id: str):
+        """
+        Removes the cached number of comments of the task.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            TASK_ID (str): the identifier of the task.
+        """
+        await CommentCountCache.delete_counts(redis, [task_id])
@@ -0,0 +1,217 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from settings import settings
+
+
+class LocalTTLCache:
+    """
+    In-process LRU cache with a per-entry expiration time.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, key):
+        """
+        Returns the cached value, or None if it is missing or expired.
+        """
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        """
+        Stores the value, evicting the least recently used entries over `maxsize`.
+        """
+        self._data[key] = (value, time.monotonic() + (ttl or self.ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete_where(self, predicate):
+        """
+        Removes all entries whose key matches the predicate.
+        """
+        for key in [key for key in self._data if predicate(key)]:
+            del self._data[key]
+
+
+class OwnershipCache:
+    """
+    Class for caching the results of the task ownership check.
+
+    Verdicts are the HTTP status codes returned by the Django API: 200 for the
+    owner of the task and 404 for any other user. They are kept in a short-lived
+    in-process LRU in front of the `task:{task_id}:owners` hash in Redis, where
+    each field is the subject of the check: the hash of the user token or the
+    user ID, depending on the auth mode.
+    """
+
+    CACHEABLE_VERDICTS = (200, 404)
+
+    _local = LocalTTLCache(
+        settings.OWNERSHIP_LOCAL_CACHE_SIZE, settings.OWNERSHIP_LOCAL_CACHE_TTL
+    )
+
+    @staticmethod
+    def _key(task_id: str) -> str:
+        return f"task:{task_id}:owners"
+
+    @staticmethod
+    def hash_token(token: str) -> str:
+        """
+        Returns the fingerprint of the token, so that tokens are never stored in Redis.
+        """
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def _ttl(verdict: int) -> int:
+        if verdict == 200:
+            return settings.OWNERSHIP_CACHE_TTL
+        return settings.OWNERSHIP_NEGATIVE_CACHE_TTL
+
+    @classmethod
+    async def get_verdict(cls, redis, subject: str, task_id: str):
+        """
+        Receives the cached verdict of the ownership check.
+
+        Args:
+            Redis (Redis): Redis client.
+            subject (str): Fingerprint of the token or ID of the user.
+            TASK_ID (str): the identifier of the task.
+
+        Returns:
+            int: HTTP status code of the check, or None if it is not cached.
+        """
+        verdict = cls._local.get((subject, task_id))
+        if verdict is not None:
+            return verdict
+
+        cached = await redis.hget(cls._key(task_id), subject)
+        return cls._parse_verdict(subject, task_id, cached)
+
+    @classmethod
+    async def get_verdicts(cls, redis, subject: str, task_ids) -> dict:
+        """
+        Receives the cached verdicts of the ownership check for several tasks with one round trip.
+
+        Args:
+            Redis (Redis): Redis client.
+            subject (str): Fingerprint of the token or ID of the user.
+            task_ids (Iterable [str]): identifiers of the tasks.
+
+        Returns:
+            dict: task ID -> HTTP status code of the check, only for the cached checks.
+        """
+        verdicts = {}
+        missing = []
+        for task_id in task_ids:
+            verdict = cls._local.get((subject, task_id))
+            if verdict is None:
+                missing.append(task_id)
+            else:
+                verdicts[task_id] = verdict
+
+        if missing:
+            async with redis.pipeline(transaction=False) as pipe:
+                for task_id in missing:
+                    pipe.hget(cls._key(task_id), subject)
+                cached = await pipe.execute()
+
+            for task_id, value in zip(missing, cached):
+                verdict = cls._parse_verdict(subject, task_id, value)
+                if verdict is not None:
+                    verdicts[task_id] = verdict
+
+        return verdicts
+
+    @classmethod
+    def _parse_verdict(cls, subject: str, task_id: str, cached):
+        if not cached:
+            return None
+
+        verdict, expires_at = cached.split(":")
+        ttl = float(expires_at) - time.time()
+        if ttl <= 0:
+            return None
+
+        verdict = int(verdict)
+        cls._local.set(
+            (subject, task_id),
+            verdict,
+            min(ttl, settings.OWNERSHIP_LOCAL_CACHE_TTL),
+        )
+        return verdict
+
+    @classmethod
+    async def set_verdict(cls, redis, subject: str, task_id: str, verdict: int):
+        """
+        Caches the verdict of the ownership check, if it is not a transient error.
+
+        Args:
+            Redis (Redis): Redis client.
+            subject (str): Fingerprint of the token or ID of the user.
+            TASK_ID (str): the identifier of the task.
+            verdict (int): HTTP status code returned by the Django API.
+        """
+        await cls.set_verdicts(redis, subject, {task_id: verdict})
+
+    @classmethod
+    async def set_verdicts(cls, redis, subject: str, verdicts: dict):
+        """
+        Caches the verdicts of the ownership check for several tasks with one round trip.
+
+        Args:
+            Redis (Redis): Redis client.
+            subject (str): Fingerprint of the token or ID of the user.
+            verdicts (dict): task ID -> HTTP status code returned by the Django API.
+        """
+        verdicts = {
+            task_id: verdict
+            for task_id, verdict in verdicts.items()
+            if verdict in cls.CACHEABLE_VERDICTS
+        }
+        if not verdicts:
+            return
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for task_id, verdict in verdicts.items():
+                ttl = cls._ttl(verdict)
+                cls._local.set(
+                    (subject, task_id),
+                    verdict,
+                    min(ttl, settings.OWNERSHIP_LOCAL_CACHE_TTL),
+                )
+                pipe.hset(cls._key(task_id), subject, f"{verdict}:{time.time() + ttl}")
+                pipe.expire(
+                    cls._key(task_id),
+                    max(
+                        settings.OWNERSHIP_CACHE_TTL,
+                        settings.OWNERSHIP_NEGATIVE_CACHE_TTL,
+                    ),
+                )
+            await pipe.execute()
+
+    @classmethod
+    async def invalidate_task(cls, redis, task_id: str):
+        """
+        Removes all cached verdicts for the task, e.g. when the task is deleted.
+
+        Args:
+            Redis (Redis): Redis client.
+            TASK_ID (str): the identifier of the task.
+        """
+        cls._local.delete_where(lambda key: key[1] == task_id)
+        await redis.delete(cls._key(task_id))
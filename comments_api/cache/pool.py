@@ -0,0 +1,74 @@
+import time
+
+import redis.asyncio as redis
+from settings import settings
+
+
+class MeteredConnectionPool(redis.BlockingConnectionPool):
+    """
+    Blocking Redis connection pool that tracks how long callers wait for a connection.
+
+    A single pool is created per application process and shared by every request,
+    so the number of sockets opened to Redis is bounded by `max_connections`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.acquired_total = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def get_connection(self, *args, **kwargs):
+        """
+        Takes a connection from the pool, recording the time spent waiting for it.
+        """
+        started = time.perf_counter()
+        try:
+            return await super().get_connection(*args, **kwargs)
+        finally:
+            waited = time.perf_counter() - started
+            self.acquired_total += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+    def stats(self) -> dict:
+        """
+        Returns the current state of the pool.
+
+        Returns:
+            dict: connections in use / idle and wait time statistics (in seconds).
+        """
+        return {
+            "max_connections": self.max_connections,
+            "in_use": len(self._in_use_connections),
+            "idle": len(self._available_connections),
+            "acquired_total": self.acquired_total,
+            "wait_time_total": round(self.wait_time_total, 6),
+            "wait_time_avg": round(
+                self.wait_time_total / self.acquired_total, 6
+            )
+            if self.acquired_total
+            else 0.0,
+            "wait_time_max": round(self.wait_time_max, 6),
+        }
+
+
+def create_redis_pool(max_connections: int = None) -> MeteredConnectionPool:
+    """
+    Creates the application-wide Redis connection pool from the settings.
+
+    Args:
+        max_connections (int): size of the pool, `REDIS_POOL_SIZE` by default.
+
+    Returns:
+        MeteredConnectionPool: Pool shared by all Redis clients of the process.
+    """
+    return MeteredConnectionPool.from_url(
+        settings.REDIS_URL,
+        decode_responses=True,
+        max_connections=max_connections or settings.REDIS_POOL_SIZE,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+    )
@@ -1,10 +1,20 @@
+import secrets
+
 import httpx
-from fastapi import HTTPException, Security
+import jwt
+from cache.ownership import OwnershipCache
+from dependencies.cache import get_redis_client
+from dependencies.http import get_http_client
+from fastapi import Depends, Header, HTTPException, Security
 from fastapi.security import HTTPBearer
 from settings import settings
 
 security = HTTPBearer()
 
+# Authentication modes
+REMOTE_AUTH = "remote"  # the token is validated by the Django API
+JWT_AUTH = "jwt"  # the token is validated locally with the shared signing key
+
 # Standard errors
 ERRORS = {
     401: HTTPException(
@@ -17,14 +27,29 @@ ERRORS = {
     500: HTTPException(status_code=500, detail="Ошибка связи с Django API."),
 }
 
+SERVICE_TOKEN_ERROR = HTTPException(status_code=403, detail="Неверный токен сервиса")
+
 
-async def check_task_ownership(task_id: str, user_token: str = Security(security)):
+async def check_task_ownership(
+    task_id: str,
+    user_token: str = Security(security),
+    redis=Depends(get_redis_client),
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
     """
     Checks whether the task belongs to the current user.
 
+    The verdict of the Django API is cached per (token, task) pair, including
+    the "not found" answers, so repeated requests skip the network round trip.
+    In the `jwt` auth mode the token is verified locally and the verdict is
+    cached per (user, task) pair, so the Django API is only asked about the
+    ownership of the task.
+
     Args:
         TASK_ID (str): ID Tasks for verification.
         user_token (str): user token for authorization.
+        Redis: Client Redis for caching.
+        client (httpx.AsyncClient): shared HTTP client for the Django API.
 
     RAISES:
         Httpexception: In case of communication error with the Django API or incorrect token.
@@ -32,17 +57,201 @@ async def check_task_ownership(task_id: str, user_token: str = Security(security
     Returns:
         Bool: True, if the task belongs to the user.
     """
-    headers = {"Authorization": f"Bearer {user_token.credentials}"}
+    subject = get_token_subject(user_token.credentials)
+    verdict = await OwnershipCache.get_verdict(redis, subject, task_id)
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{settings.DJANGO_BACKEND_URL}tasks/{task_id}", headers=headers
-            )
-        except httpx.ConnectError:
-            raise ERRORS.get(500)
+    if verdict is None:
+        verdict = await _request_ownership(client, user_token.credentials, task_id)
+        await OwnershipCache.set_verdict(redis, subject, task_id, verdict)
 
-    if response.status_code == 200:
+    if verdict == 200:
         return True
 
-    raise ERRORS.get(response.status_code, ERRORS.get(500))
+    raise ERRORS.get(verdict, ERRORS.get(500))
+
+
+async def check_tasks_ownership(
+    task_ids,
+    user_token,
+    redis,
+    client: httpx.AsyncClient,
+):
+    """
+    Checks whether all the tasks belong to the current user.
+
+    The cached verdicts are read in one round trip, and the Django API is
+    asked about all the remaining tasks at once.
+
+    Args:
+        task_ids (Iterable [str]): ID Tasks for verification.
+        user_token (str): user token for authorization.
+        Redis: Client Redis for caching.
+        client (httpx.AsyncClient): shared HTTP client for the Django API.
+
+    RAISES:
+        Httpexception: If any of the checks fails.
+
+    Returns:
+        Bool: True, if all the tasks belong to the user.
+    """
+    task_ids = set(task_ids)
+    subject = get_token_subject(user_token.credentials)
+    verdicts = await OwnershipCache.get_verdicts(redis, subject, task_ids)
+
+    missing = task_ids - verdicts.keys()
+    if missing:
+        requested = await _request_tasks_ownership(
+            client, user_token.credentials, missing
+        )
+        await OwnershipCache.set_verdicts(redis, subject, requested)
+        verdicts.update(requested)
+
+    for verdict in verdicts.values():
+        if verdict != 200:
+            raise ERRORS.get(verdict, ERRORS.get(500))
+    return True
+
+
+async def check_service_token(x_service_token: str = Header(None)):
+    """
+    Checks that the request comes from another service of the project, e.g. the Django API.
+
+    Args:
+        x_service_token (str): value of the X-Service-Token header.
+
+    RAISES:
+        Httpexception: If the internal API is disabled or the token does not match `SERVICE_TOKEN`.
+
+    Returns:
+        Bool: True, if the token is valid.
+    """
+    if not settings.SERVICE_TOKEN or not x_service_token:
+        raise SERVICE_TOKEN_ERROR
+    if not secrets.compare_digest(x_service_token, settings.SERVICE_TOKEN):
+        raise SERVICE_TOKEN_ERROR
+    return True
+
+
+def get_token_subject(token: str) -> str:
+    """
+    Returns the key under which the ownership verdicts of the token are cached.
+
+    Args:
+        token (str): user token for authorization.
+
+    RAISES:
+        Httpexception: If the token is rejected in the `jwt` auth mode.
+
+    Returns:
+        str: "user:<user_id>" in the `jwt` auth mode, otherwise the hash of the token.
+    """
+    if settings.AUTH_MODE == JWT_AUTH:
+        return f"user:{decode_user_id(token)}"
+    return OwnershipCache.hash_token(token)
+
+
+def decode_user_id(token: str) -> int:
+    """
+    Verifies the SimpleJWT access token with the signing key shared with Django.
+
+    Args:
+        token (str): user token for authorization.
+
+    RAISES:
+        Httpexception: If the token is invalid, expired or is not an access token.
+
+    Returns:
+        int: ID of the user the token was issued to.
+    """
+    try:
+        payload = jwt.decode(
+            token,
+            settings.JWT_SIGNING_KEY,
+            algorithms=[settings.JWT_ALGORITHM],
+            options={"require": ["exp", settings.JWT_USER_ID_CLAIM]},
+        )
+        if payload.get("token_type") != "access":
+            raise jwt.InvalidTokenError("Not an access token")
+        return int(payload[settings.JWT_USER_ID_CLAIM])
+    except (jwt.InvalidTokenError, ValueError):
+        raise ERRORS.get(401)
+
+
+async def _request_ownership(client: httpx.AsyncClient, token: str, task_id: str):
+    """
+    Asks the Django API for the task on behalf of the user.
+
+    Returns:
+        int: HTTP status code of the Django API response.
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+
+    try:
+        response = await client.get(
+            f"{settings.DJANGO_BACKEND_URL}tasks/{task_id}", headers=headers
+        )
+    except httpx.RequestError:
+        raise ERRORS.get(500)
+
+    return response.status_code
+
+
+async def get_owned_task_ids(
+    user_token: str = Security(security),
+    client: httpx.AsyncClient = Depends(get_http_client),
+) -> list[str]:
+    """
+    Receives the IDs of all the tasks of the current user.
+
+    Args:
+        user_token (str): user token for authorization.
+        client (httpx.AsyncClient): shared HTTP client for the Django API.
+
+    RAISES:
+        Httpexception: In case of communication error with the Django API or incorrect token.
+
+    Returns:
+        list [str]: IDs of the tasks of the user.
+    """
+    status_code, owned = await _request_owned_tasks(client, user_token.credentials)
+    if status_code != 200:
+        raise ERRORS.get(status_code, ERRORS.get(500))
+    return owned
+
+
+async def _request_tasks_ownership(client: httpx.AsyncClient, token: str, task_ids):
+    """
+    Asks the Django API which of the tasks belong to the user, in a single request.
+
+    Returns:
+        dict: task ID -> 200 for the tasks of the user, 404 for the others,
+        or the HTTP status code of the Django API response if it is not 200.
+    """
+    status_code, owned = await _request_owned_tasks(client, token, task_ids)
+    if status_code != 200:
+        return dict.fromkeys(task_ids, status_code)
+
+    owned = set(owned)
+    return {task_id: 200 if task_id in owned else 404 for task_id in task_ids}
+
+
+async def _request_owned_tasks(client: httpx.AsyncClient, token: str, task_ids=None):
+    """
+    Asks the Django API for the IDs of the tasks of the user, among `task_ids` if given.
+
+    Returns:
+        tuple: HTTP status code of the Django API response and the IDs (None unless the code is 200).
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"ids": ",".join(sorted(task_ids))} if task_ids is not None else None
+
+    try:
+        response = await client.get(
+            f"{settings.DJANGO_BACKEND_URL}tasks/owned", params=params, headers=headers
+        )
+    except httpx.RequestError:
+        raise ERRORS.get(500)
+
+    if response.status_code != 200:
+        return response.status_code, None
+    return 200, response.json()["ids"]
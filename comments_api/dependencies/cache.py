@@ -1,5 +1,9 @@
-from cache.comments import CommentCache
+from fastapi import Request
 
 
-async def get_redis_client():
-    return await CommentCache.get_redis()
+async def get_redis_client(request: Request):
+    return request.app.state.redis
+
+
+async def get_blocking_redis_client(request: Request):
+    return request.app.state.redis_blocking
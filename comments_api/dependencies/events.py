@@ -0,0 +1,9 @@
+from fastapi import Request
+
+
+async def get_comment_events(request: Request):
+    return request.app.state.comment_events
+
+
+async def get_comment_event_waiters(request: Request):
+    return request.app.state.comment_event_waiters
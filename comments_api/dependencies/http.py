@@ -0,0 +1,5 @@
+from fastapi import Request
+
+
+async def get_http_client(request: Request):
+    return request.app.state.http_client
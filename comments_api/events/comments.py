@@ -0,0 +1,186 @@
+import time
+
+from redis.exceptions import ResponseError
+from schemas.comment import CommentResponse
+from settings import settings
+
+
+class CommentEvents:
+    """
+    Class for publishing and reading the changes of comments through a Redis Stream.
+
+    Every change is appended to the `comments:events` stream, capped at about
+    `COMMENTS_EVENTS_MAXLEN` entries. An entry has the fields:
+    - type: "created", "updated", "deleted" or "cleared" (all comments of the task removed);
+    - task_id: the identifier of the task;
+    - comment_id: Comment identifier, empty for "cleared";
+    - comment: JSON of the comment in the shape of `CommentResponse`, empty for removals.
+    """
+
+    KEY = "comments:events"
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    CLEARED = "cleared"
+
+    @staticmethod
+    def _fields(event_type: str, task_id: str, comment_id=None, comment=None) -> dict:
+        return {
+            "type": event_type,
+            "task_id": task_id,
+            "comment_id": comment_id if comment_id is not None else "",
+            "comment": CommentResponse.model_validate(comment).model_dump_json()
+            if comment is not None
+            else "",
+        }
+
+    @staticmethod
+    async def publish(redis, event_type: str, task_id: str, comment_id=None, comment=None):
+        """
+        Appends the change of a comment to the stream.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            event_type (str): type of the change.
+            TASK_ID (str): the identifier of the task.
+            Comment_id (int): Comment identifier, None for "cleared".
+            Comment: the comment after the change, None for removals.
+        """
+        await redis.xadd(
+            CommentEvents.KEY,
+            CommentEvents._fields(event_type, task_id, comment_id, comment),
+            maxlen=settings.COMMENTS_EVENTS_MAXLEN,
+            approximate=True,
+        )
+
+    @staticmethod
+    async def publish_created(redis, comments):
+        """
+        Appends the creation of several comments to the stream with a single round trip.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            Comments (list): New comments.
+        """
+        async with redis.pipeline(transaction=False) as pipe:
+            for comment in comments:
+                pipe.xadd(
+                    CommentEvents.KEY,
+                    CommentEvents._fields(
+                        CommentEvents.CREATED, comment.task_id, comment.id, comment
+                    ),
+                    maxlen=settings.COMMENTS_EVENTS_MAXLEN,
+                    approximate=True,
+                )
+            await pipe.execute()
+
+    @staticmethod
+    def parse_event(entry_id: str, fields: dict) -> dict:
+        """
+        Converts a stream entry into a `CommentEvent`-shaped dict.
+        """
+        return {
+            "id": entry_id,
+            "type": fields["type"],
+            "task_id": fields["task_id"],
+            "comment_id": int(fields["comment_id"]) if fields["comment_id"] else None,
+            "comment": CommentResponse.model_validate_json(fields["comment"])
+            if fields["comment"]
+            else None,
+        }
+
+    @staticmethod
+    def parse_id(entry_id: str) -> tuple[int, int]:
+        """
+        Splits the ID of a stream entry into comparable parts.
+
+        RAISES:
+            ValueError: If the ID is malformed.
+        """
+        milliseconds, sequence = entry_id.split("-")
+        return int(milliseconds), int(sequence)
+
+    @staticmethod
+    async def last_id(redis) -> str:
+        """
+        Returns the ID of the newest entry of the stream, "0-0" if it is empty.
+        """
+        entries = await redis.xrevrange(CommentEvents.KEY, count=1)
+        return entries[0][0] if entries else "0-0"
+
+    @staticmethod
+    async def is_trimmed_after(redis, after_id: tuple) -> bool:
+        """
+        Checks whether entries following `after_id` were trimmed from the stream.
+
+        Nothing was trimmed while the stream holds every entry ever added to it,
+        otherwise the trimmed entries are the ones older than its first entry.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            after_id (tuple): parsed ID of the last entry seen by the consumer.
+
+        Returns:
+            bool: True if the consumer may have missed trimmed entries.
+        """
+        try:
+            info = await redis.xinfo_stream(CommentEvents.KEY)
+        except ResponseError:
+            # the stream has not been created yet
+            return False
+        # "entries-added" is only reported since Redis 7
+        if info.get("entries-added") == info["length"]:
+            return False
+        first = info.get("first-entry")
+        return bool(first) and after_id < CommentEvents.parse_id(first[0])
+
+    @staticmethod
+    async def read(redis, task_ids, after: str, count: int, block_ms: int):
+        """
+        Reads the changes of the comments of the tasks that follow the entry `after`.
+
+        Entries of other tasks are skipped. If none of the tasks has changed,
+        waits for up to `block_ms` milliseconds for new entries.
+
+        Args:
+            REDIS (REDIS): an object of a client of a client.
+            task_ids (Iterable [str]): identifiers of the tasks.
+            after (str): ID of the last entry seen by the consumer, None to start from the newest entry.
+            count (int): maximum number of entries read from the stream at once.
+            block_ms (int): how long to wait for the changes, 0 for no waiting.
+
+        RAISES:
+            ValueError: If `after` is malformed.
+
+        Returns:
+            tuple: events, ID to pass as `after` on the next read, and whether
+            the entries following `after` may have been trimmed from the stream.
+        """
+        task_ids = set(task_ids)
+        truncated = False
+        if after is None:
+            after = await CommentEvents.last_id(redis)
+        else:
+            truncated = await CommentEvents.is_trimmed_after(
+                redis, CommentEvents.parse_id(after)
+            )
+
+        deadline = time.monotonic() + block_ms / 1000
+        events = []
+        while True:
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            # block=None does not wait at all, while block=0 would wait forever
+            response = await redis.xread(
+                {CommentEvents.KEY: after},
+                count=count,
+                block=remaining_ms if remaining_ms > 0 else None,
+            )
+            entries = response[0][1] if response else []
+            for entry_id, fields in entries:
+                after = entry_id
+                if fields["task_id"] in task_ids:
+                    events.append(CommentEvents.parse_event(entry_id, fields))
+
+            if events or not entries or remaining_ms <= 0:
+                return events, after, truncated
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+
+from events.comments import CommentEvents
+from schemas.comment import CommentEvent
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Markers passed to the subscribers along with the events
+RESET = "reset"  # events were dropped, the comments should be reloaded
+CLOSED = "closed"  # the worker is shutting down
+
+
+class CommentEventsBroadcaster:
+    """
+    Fans out the comment events to the live subscribers of the worker.
+
+    A single background reader per worker follows the `comments:events`
+    stream and puts the events of the subscribed tasks into the bounded
+    queues of their subscribers, so idle subscribers hold neither Redis
+    nor database connections.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._reader = None
+
+    def start(self):
+        """
+        Starts following the stream from its newest entry.
+        """
+        self._reader = asyncio.create_task(self._read_stream())
+
+    async def stop(self):
+        """
+        Stops following the stream and ends the streams of all the subscribers.
+        """
+        self._reader.cancel()
+        await asyncio.gather(self._reader, return_exceptions=True)
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._replace_backlog(queue, CLOSED)
+
+    def subscribe(self, task_id: str) -> asyncio.Queue:
+        """
+        Registers a subscriber to the events of the task.
+
+        Returns:
+            asyncio.Queue: queue of the events of the task, `RESET` and `CLOSED` markers.
+        """
+        queue = asyncio.Queue(maxsize=settings.COMMENTS_LIVE_QUEUE_SIZE)
+        self._subscribers.setdefault(task_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue):
+        """
+        Removes the subscriber registered by `subscribe`.
+        """
+        queues = self._subscribers.get(task_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[task_id]
+
+    def stats(self) -> dict:
+        """
+        Returns the number of subscribed tasks and subscribers of the worker.
+        """
+        return {
+            "tasks": len(self._subscribers),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+        }
+
+    async def _read_stream(self):
+        last_id = None
+        while True:
+            try:
+                if last_id is None:
+                    last_id = await CommentEvents.last_id(self.redis)
+                # Blocks for less than the socket timeout of the Redis client
+                response = await self.redis.xread(
+                    {CommentEvents.KEY: last_id},
+                    count=settings.COMMENTS_EVENTS_READ_COUNT,
+                    block=settings.COMMENTS_EVENTS_MAX_BLOCK_MS,
+                )
+            except Exception:
+                logger.exception("Failed to read the comment events")
+                await asyncio.sleep(1)
+                continue
+
+            for entry_id, fields in response[0][1] if response else []:
+                last_id = entry_id
+                queues = self._subscribers.get(fields["task_id"])
+                if not queues:
+                    continue
+                event = CommentEvents.parse_event(entry_id, fields)
+                for queue in queues:
+                    self._push(queue, event)
+
+    def _push(self, queue: asyncio.Queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The subscriber does not keep up: drop its backlog, it has to reload the comments
+            self._replace_backlog(queue, RESET)
+
+    @staticmethod
+    def _replace_backlog(queue: asyncio.Queue, marker: str):
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(marker)
+
+
+def format_sse(event) -> str:
+    """
+    Formats the event or the `RESET` marker as a Server-Sent Event.
+    """
+    if event == RESET:
+        return "event: reset\ndata: {}\n\n"
+    data = CommentEvent.model_validate(event).model_dump_json()
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+async def comment_events_sse(
+    broadcaster: CommentEventsBroadcaster, redis, task_id: str, last_event_id: str = None
+):
+    """
+    Yields the changes of the comments of the task as Server-Sent Events until the client disconnects.
+
+    A reconnecting client passes the ID of the last received event and
+    first receives the events it has missed, or a "reset" event if they are
+    no longer in the stream.
+
+    Args:
+        broadcaster (CommentEventsBroadcaster): broadcaster of the worker.
+        Redis: Client Redis for caching.
+        TASK_ID (str): the identifier of the task.
+        last_event_id (str): value of the Last-Event-ID header, None for a new subscription.
+    """
+    queue = broadcaster.subscribe(task_id)
+    try:
+        replayed_id = None
+        if last_event_id:
+            try:
+                async for event in _missed_events(redis, task_id, last_event_id):
+                    replayed_id = CommentEvents.parse_id(event["id"])
+                    yield format_sse(event)
+            except ValueError:
+                yield format_sse(RESET)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    queue.get(), settings.COMMENTS_LIVE_HEARTBEAT
+                )
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing the idle connection
+                yield ": ping\n\n"
+                continue
+
+            if event == CLOSED:
+                return
+            if (
+                event != RESET
+                and replayed_id is not None
+                and CommentEvents.parse_id(event["id"]) <= replayed_id
+            ):
+                continue
+            yield format_sse(event)
+    finally:
+        broadcaster.unsubscribe(task_id, queue)
+
+
+async def _missed_events(redis, task_id: str, after: str):
+    """
+    Yields the events of the task following `after` that are still in the stream.
+
+    RAISES:
+        ValueError: If `after` is malformed or the events may have been trimmed.
+    """
+    while True:
+        events, next_after, truncated = await CommentEvents.read(
+            redis, [task_id], after, settings.COMMENTS_EVENTS_READ_COUNT, 0
+        )
+        if truncated:
+            raise ValueError("Events have been trimmed")
+        for event in events:
+            yield event
+        if next_after == after:
+            return
+        after = next_after
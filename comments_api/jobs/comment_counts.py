@@ -0,0 +1,13 @@
+from db import AsyncSessionLocal
+from services.comments import CommentService
+
+
+async def reconcile_comment_counts(redis):
+    """
+    Fixes the drift of the comment counters, see `CommentService.reconcile_comment_counts`.
+
+    Args:
+        Redis: Client Redis for caching.
+    """
+    async with AsyncSessionLocal() as db:
+        await CommentService.reconcile_comment_counts(db, redis)
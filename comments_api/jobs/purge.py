@@ -0,0 +1,37 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from db import AsyncSessionLocal
+from repositories.comments import CommentRepository
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def purge_deleted_comments():
+    """
+    Removes the comments soft-deleted more than `COMMENTS_PURGE_RETENTION` seconds ago.
+
+    Rows are removed in batches of `COMMENTS_PURGE_BATCH_SIZE`, each in its own
+    short transaction with a pause in between, so the purge of a mass delete
+    never holds locks for long.
+
+    Returns:
+        int: The number of removed comments.
+    """
+    retention = timedelta(seconds=settings.COMMENTS_PURGE_RETENTION)
+    purged = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            deleted_count = await CommentRepository.purge_deleted_comments(
+                db, retention, settings.COMMENTS_PURGE_BATCH_SIZE
+            )
+        purged += deleted_count
+        if deleted_count < settings.COMMENTS_PURGE_BATCH_SIZE:
+            break
+        await asyncio.sleep(settings.COMMENTS_PURGE_PAUSE)
+
+    if purged:
+        logger.info(f"Purged {purged} deleted comments")
+    return purged
@@ -0,0 +1,26 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def run_periodically(redis, name: str, interval: int, job):
+    """
+    Runs the job every `interval` seconds in one of the workers.
+
+    Runs in every worker, but only the worker that takes the slot of the
+    interval in Redis runs the job.
+
+    Args:
+        Redis: Client Redis for caching.
+        name (str): name of the job, unique within the service.
+        interval (int): interval between the runs, in seconds.
+        job: coroutine function without arguments.
+    """
+    while True:
+        try:
+            if await redis.set(f"jobs:{name}:slot", 1, nx=True, ex=interval):
+                await job()
+        except Exception:
+            logger.exception(f"Job {name} failed")
+        await asyncio.sleep(interval)
@@ -1,6 +1,86 @@
-from api import comments
+import asyncio
+from contextlib import asynccontextmanager
+
+import httpx
+import redis.asyncio as redis
+from api import comments, internal, metrics
+from cache.pool import create_redis_pool
+from db import engine
+from events.live import CommentEventsBroadcaster
 from fastapi import FastAPI
+from jobs.comment_counts import reconcile_comment_counts
+from jobs.purge import purge_deleted_comments
+from jobs.scheduler import run_periodically
+from settings import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Owns the connections shared by all requests of the worker process.
+    """
+    app.state.redis_pool = create_redis_pool()
+    app.state.redis = redis.Redis(connection_pool=app.state.redis_pool)
+    # blocking XREADs hold their connections, so they get a pool of their own:
+    # one connection per waiting request plus one for the live broadcaster
+    app.state.redis_blocking_pool = create_redis_pool(
+        settings.COMMENTS_EVENTS_MAX_WAITERS + 1
+    )
+    app.state.redis_blocking = redis.Redis(
+        connection_pool=app.state.redis_blocking_pool
+    )
+    app.state.comment_event_waiters = asyncio.Semaphore(
+        settings.COMMENTS_EVENTS_MAX_WAITERS
+    )
+    app.state.http_client = httpx.AsyncClient(
+        # HTTP/2 is only negotiated over TLS, a plain-http backend stays on HTTP/1.1
+        http2=settings.DJANGO_HTTP2 and settings.DJANGO_BACKEND_URL.startswith("https://"),
+        limits=httpx.Limits(
+            max_connections=settings.DJANGO_POOL_SIZE,
+            max_keepalive_connections=settings.DJANGO_KEEPALIVE_CONNECTIONS,
+        ),
+        timeout=settings.DJANGO_TIMEOUT,
+    )
+    app.state.comment_events = CommentEventsBroadcaster(app.state.redis_blocking)
+    app.state.comment_events.start()
+    background_jobs = []
+    if settings.COMMENTS_COUNTS_RECONCILE_INTERVAL > 0:
+        background_jobs.append(
+            asyncio.create_task(
+                run_periodically(
+                    app.state.redis,
+                    "reconcile_comment_counts",
+                    settings.COMMENTS_COUNTS_RECONCILE_INTERVAL,
+                    lambda: reconcile_comment_counts(app.state.redis),
+                )
+            )
+        )
+    if settings.COMMENTS_PURGE_INTERVAL > 0:
+        background_jobs.append(
+            asyncio.create_task(
+                run_periodically(
+                    app.state.redis,
+                    "purge_deleted_comments",
+                    settings.COMMENTS_PURGE_INTERVAL,
+                    purge_deleted_comments,
+                )
+            )
+        )
+    yield
+    await app.state.comment_events.stop()
+    for job in background_jobs:
+        job.cancel()
+    await asyncio.gather(*background_jobs, return_exceptions=True)
+    await app.state.http_client.aclose()
+    await app.state.redis.aclose()
+    await app.state.redis_pool.disconnect()
+    await app.state.redis_blocking.aclose()
+    await app.state.redis_blocking_pool.disconnect()
+    await engine.dispose()
+
 
-app = FastAPI(title="Only Comments Microservice")
+app = FastAPI(title="Only Comments Microservice", lifespan=lifespan)
 
 app.include_router(comments.router, prefix="/comments", tags=["comments"])
+app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
+app.include_router(internal.router, prefix="/internal", tags=["internal"])
@@ -0,0 +1,59 @@
+"""Composite index for keyset pagination of comments
+
+Revision ID: 5c1e8a7d92b4
+Revises: 953a1e91bb41
+Create Date: 2026-10-18 10:12:41.503118
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e8a7d92b4'
+down_revision: Union[str, None] = '953a1e91bb41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "UPDATE fastapi_comments SET created_at = now() WHERE created_at IS NULL"
+    )
+    op.alter_column(
+        'fastapi_comments',
+        'created_at',
+        existing_type=sa.DateTime(),
+        nullable=False,
+        server_default=sa.text('now()'),
+    )
+    op.create_index(
+        'ix_fastapi_comments_task_id_created_at_id',
+        'fastapi_comments',
+        ['task_id', 'created_at', 'id'],
+        unique=False,
+    )
+    # The composite index also serves lookups by task_id alone
+    op.drop_index(op.f('ix_fastapi_comments_task_id'), table_name='fastapi_comments')
+
+
+def downgrade() -> None:
+    op.create_index(
+        op.f('ix_fastapi_comments_task_id'),
+        'fastapi_comments',
+        ['task_id'],
+        unique=False,
+    )
+    op.drop_index(
+        'ix_fastapi_comments_task_id_created_at_id', table_name='fastapi_comments'
+    )
+    op.alter_column(
+        'fastapi_comments',
+        'created_at',
+        existing_type=sa.DateTime(),
+        nullable=True,
+        server_default=None,
+    )
@@ -0,0 +1,36 @@
+"""Denormalized comment counts per task
+
+Revision ID: 8f3b6d2a41c7
+Revises: 5c1e8a7d92b4
+Create Date: 2026-10-18 11:02:17.284519
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3b6d2a41c7'
+down_revision: Union[str, None] = '5c1e8a7d92b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'fastapi_comment_counts',
+        sa.Column('task_id', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('task_id'),
+    )
+    op.execute(
+        "INSERT INTO fastapi_comment_counts (task_id, count) "
+        "SELECT task_id, count(*) FROM fastapi_comments GROUP BY task_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('fastapi_comment_counts')
@@ -0,0 +1,47 @@
+"""Full-text search over comments
+
+Revision ID: a4d9e27c5b13
+Revises: 8f3b6d2a41c7
+Create Date: 2026-10-18 11:47:05.913260
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d9e27c5b13'
+down_revision: Union[str, None] = '8f3b6d2a41c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Generated column: Postgres keeps it in sync with the content, no trigger needed
+    op.add_column(
+        'fastapi_comments',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('russian', content)", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        'ix_fastapi_comments_search_vector',
+        'fastapi_comments',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_fastapi_comments_search_vector', table_name='fastapi_comments'
+    )
+    op.drop_column('fastapi_comments', 'search_vector')
@@ -0,0 +1,80 @@
+"""Soft delete of comments
+
+Revision ID: c7e2f5a93d18
+Revises: a4d9e27c5b13
+Create Date: 2026-10-18 13:21:44.170392
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2f5a93d18'
+down_revision: Union[str, None] = 'a4d9e27c5b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'fastapi_comments', sa.Column('deleted_at', sa.DateTime(), nullable=True)
+    )
+
+    # Indexes of the live comments leave the soft-deleted ones out
+    op.drop_index(
+        'ix_fastapi_comments_task_id_created_at_id', table_name='fastapi_comments'
+    )
+    op.create_index(
+        'ix_fastapi_comments_task_id_created_at_id',
+        'fastapi_comments',
+        ['task_id', 'created_at', 'id'],
+        unique=False,
+        postgresql_where=sa.text('deleted_at IS NULL'),
+    )
+    op.drop_index(
+        'ix_fastapi_comments_search_vector', table_name='fastapi_comments'
+    )
+    op.create_index(
+        'ix_fastapi_comments_search_vector',
+        'fastapi_comments',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_where=sa.text('deleted_at IS NULL'),
+    )
+    op.create_index(
+        'ix_fastapi_comments_deleted_at',
+        'fastapi_comments',
+        ['deleted_at'],
+        unique=False,
+        postgresql_where=sa.text('deleted_at IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM fastapi_comments WHERE deleted_at IS NOT NULL")
+    op.drop_index('ix_fastapi_comments_deleted_at', table_name='fastapi_comments')
+    op.drop_index(
+        'ix_fastapi_comments_search_vector', table_name='fastapi_comments'
+    )
+    op.create_index(
+        'ix_fastapi_comments_search_vector',
+        'fastapi_comments',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+    op.drop_index(
+        'ix_fastapi_comments_task_id_created_at_id', table_name='fastapi_comments'
+    )
+    op.create_index(
+        'ix_fastapi_comments_task_id_created_at_id',
+        'fastapi_comments',
+        ['task_id', 'created_at', 'id'],
+        unique=False,
+    )
+    op.drop_column('fastapi_comments', 'deleted_at')
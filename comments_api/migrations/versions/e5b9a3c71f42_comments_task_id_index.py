@@ -0,0 +1,34 @@
+"""Index of all the comments of a task
+
+Revision ID: e5b9a3c71f42
+Revises: c7e2f5a93d18
+Create Date: 2026-10-18 16:05:12.381954
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b9a3c71f42'
+down_revision: Union[str, None] = 'c7e2f5a93d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The partial indexes skip the soft-deleted comments, the batched removal
+    # of the comments of a task and their move must see all of them
+    op.create_index(
+        'ix_fastapi_comments_task_id_id',
+        'fastapi_comments',
+        ['task_id', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_fastapi_comments_task_id_id', table_name='fastapi_comments')
@@ -1,17 +1,81 @@
-from sqlalchemy import Column, DateTime, Integer, String, func
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import (
+    Column,
+    Computed,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import declarative_base, deferred
 
 Base = declarative_base()
 
+# Text search configuration of the `search_vector` column, queries must use the same one
+SEARCH_CONFIG = "russian"
+
 
 class Comment(Base):
     __tablename__ = "fastapi_comments"
+    __table_args__ = (
+        # Indexes of the live comments leave the soft-deleted ones out.
+        # Backs the keyset pagination of the comments of a task
+        Index(
+            "ix_fastapi_comments_task_id_created_at_id",
+            "task_id",
+            "created_at",
+            "id",
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        Index(
+            "ix_fastapi_comments_search_vector",
+            "search_vector",
+            postgresql_using="gin",
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        # Backs the purge of the soft-deleted comments
+        Index(
+            "ix_fastapi_comments_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+        ),
+        # Covers all the comments of a task, soft-deleted included: backs the
+        # batched removal of the comments of deleted tasks and their move
+        Index("ix_fastapi_comments_task_id_id", "task_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(String, nullable=False, index=True)
+    task_id = Column(String, nullable=False)
     user_id = Column(Integer, nullable=False, index=True)
     content = Column(String, nullable=False)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(
+        DateTime, nullable=False, default=func.now(), server_default=func.now()
+    )
+    # Set when the comment is deleted, the row is removed later by the purge job
+    deleted_at = Column(DateTime, nullable=True)
+    # Maintained by Postgres, never loaded with the comment
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(f"to_tsvector('{SEARCH_CONFIG}', content)", persisted=True),
+        )
+    )
 
     def __repr__(self):
         return f"<Comment id={self.id} task_id={self.task_id} user_id={self.user_id}>"
+
+
+class CommentCount(Base):
+    """
+    Number of comments of a task, kept in the same transactions as the comments themselves.
+    """
+
+    __tablename__ = "fastapi_comment_counts"
+
+    task_id = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    def __repr__(self):
+        return f"<CommentCount task_id={self.task_id} count={self.count}>"
@@ -1,7 +1,15 @@
-from models.comment import Comment
+from collections import Counter
+from datetime import datetime, timedelta
+
+from models.comment import SEARCH_CONFIG, Comment, CommentCount
 from schemas.comment import CommentCreate
-from sqlalchemy import delete, select
+from sqlalchemy import delete, func, insert, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+# Comments that are not soft-deleted, matches the partial indexes
+NOT_DELETED = Comment.deleted_at.is_(None)
 
 
 class CommentRepository:
@@ -11,46 +19,361 @@ class CommentRepository:
         """Creates a new comment in the database."""
         new_comment = Comment(**comment.dict())
         db.add(new_comment)
+        await CommentRepository._add_to_counts(db, {new_comment.task_id: 1})
         await db.commit()
         await db.refresh(new_comment)
         return new_comment
 
+    @staticmethod
+    async def create_comments(db: AsyncSession, comments: list[CommentCreate]):
+        """
+        Creates the comments with multi-row INSERT ... RETURNING statements in one transaction.
+
+        Returns the new comments in the order of `comments`.
+        """
+        stmt = insert(Comment).returning(Comment, sort_by_parameter_order=True)
+        result = await db.scalars(stmt, [comment.model_dump() for comment in comments])
+        new_comments = result.all()
+        await CommentRepository._add_to_counts(
+            db, Counter(comment.task_id for comment in comments)
+        )
+        await db.commit()
+        return new_comments
+
+    @staticmethod
+    def _comments_by_task(task_id: str):
+        return (
+            select(Comment)
+            .where(Comment.task_id == task_id, NOT_DELETED)
+            .order_by(Comment.created_at, Comment.id)
+        )
+
     @staticmethod
     async def get_comments(db: AsyncSession, task_id: str):
         """Receives all the comments for the task."""
-        result = await db.execute(select(Comment).where(Comment.task_id == task_id))
+        result = await db.execute(CommentRepository._comments_by_task(task_id))
         return result.scalars().all()
 
+    @staticmethod
+    async def get_comments_page(
+        db: AsyncSession,
+        task_id: str,
+        limit: int,
+        after: tuple[datetime, int] | None = None,
+    ):
+        """
+        Receives up to `limit` comments for the task following the (created_at, id) key `after`.
+        """
+        stmt = CommentRepository._comments_by_task(task_id).limit(limit)
+        if after is not None:
+            stmt = stmt.where(tuple_(Comment.created_at, Comment.id) > tuple_(*after))
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_latest_comments(db: AsyncSession, task_ids: list[str], limit: int):
+        """
+        Receives the number of comments and the `limit` latest comments of several tasks in one query.
+
+        Returns:
+            dict: task ID -> (number of comments, latest comments ordered by (created_at, id)), only for the tasks with comments.
+        """
+        ranked = (
+            select(
+                Comment,
+                func.row_number()
+                .over(
+                    partition_by=Comment.task_id,
+                    order_by=(Comment.created_at.desc(), Comment.id.desc()),
+                )
+                .label("rank"),
+                func.count().over(partition_by=Comment.task_id).label("total"),
+            )
+            .where(Comment.task_id.in_(task_ids), NOT_DELETED)
+            .subquery()
+        )
+        latest = aliased(Comment, ranked)
+        # At least one row per task, so that the count is known even for limit=0
+        stmt = (
+            select(latest, ranked.c.total)
+            .where(ranked.c.rank <= max(limit, 1))
+            .order_by(ranked.c.task_id, ranked.c.created_at, ranked.c.id)
+        )
+        result = await db.execute(stmt)
+
+        summary = {}
+        for comment, total in result.all():
+            _, comments = summary.setdefault(comment.task_id, (total, []))
+            comments.append(comment)
+        return {
+            task_id: (total, comments[-limit:] if limit else [])
+            for task_id, (total, comments) in summary.items()
+        }
+
+    @staticmethod
+    async def search_comments(
+        db: AsyncSession,
+        task_ids: list[str],
+        query: str,
+        limit: int,
+        after: tuple[float, int] | None = None,
+    ):
+        """
+        Receives up to `limit` comments of the tasks matching the web-search style `query`.
+
+        Results are ordered by rank and id, both descending, and follow the (rank, id) key `after`.
+
+        Returns:
+            list [tuple]: (comment, rank) pairs.
+        """
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        rank = func.ts_rank_cd(Comment.search_vector, ts_query)
+        stmt = (
+            select(Comment, rank.label("rank"))
+            .where(
+                Comment.task_id.in_(task_ids),
+                NOT_DELETED,
+                Comment.search_vector.bool_op("@@")(ts_query),
+            )
+            .order_by(rank.desc(), Comment.id.desc())
+            .limit(limit)
+        )
+        if after is not None:
+            stmt = stmt.where(tuple_(rank, Comment.id) < tuple_(*after))
+        result = await db.execute(stmt)
+        return result.all()
+
+    @staticmethod
+    async def stream_comments(db: AsyncSession, task_id: str, batch_size: int):
+        """Yields the comments for the task from a server-side cursor."""
+        result = await db.stream_scalars(
+            CommentRepository._comments_by_task(task_id).execution_options(
+                yield_per=batch_size
+            )
+        )
+        async for comment in result:
+            yield comment
+
     @staticmethod
     async def get_comment_by_id(db: AsyncSession, comment_id: int):
         """Receives a comment on ID."""
-        return await db.get(Comment, comment_id)
+        result = await db.execute(
+            select(Comment).where(Comment.id == comment_id, NOT_DELETED)
+        )
+        return result.scalar_one_or_none()
 
     @staticmethod
-    async def update_comment(db: AsyncSession, comment_id: int, new_content: str):
-        """Updates the comment."""
-        comment = await db.get(Comment, comment_id)
-        if comment:
-            comment.content = new_content
-            await db.commit()
-            await db.refresh(comment)
+    async def update_comment(
+        db: AsyncSession, comment_id: int, task_id: str, new_content: str
+    ):
+        """Updates the comment of the task with a single UPDATE ... RETURNING."""
+        stmt = (
+            update(Comment)
+            .where(Comment.id == comment_id, Comment.task_id == task_id, NOT_DELETED)
+            .values(content=new_content)
+            .returning(Comment)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(stmt)
+        comment = result.scalar_one_or_none()
+        await db.commit()
         return comment
 
     @staticmethod
-    async def delete_comment(db: AsyncSession, comment_id: int):
-        """Removes a comment on ID."""
-        comment = await db.get(Comment, comment_id)
-        if comment:
-            await db.delete(comment)
-            await db.commit()
-            return True
-        return False
+    async def delete_comment(db: AsyncSession, comment_id: int, task_id: str):
+        """Soft-deletes the comment of the task with a single UPDATE ... RETURNING."""
+        stmt = (
+            update(Comment)
+            .where(Comment.id == comment_id, Comment.task_id == task_id, NOT_DELETED)
+            .values(deleted_at=func.now())
+            .returning(Comment.id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(stmt)
+        deleted_id = result.scalar_one_or_none()
+        if deleted_id is not None:
+            await CommentRepository._add_to_counts(db, {task_id: -1})
+        await db.commit()
+        return deleted_id is not None
 
     @staticmethod
     async def delete_all_comments_by_task(db: AsyncSession, task_id: str):
-        """Deletes all comments on the task"""
-        stmt = delete(Comment).where(Comment.task_id == task_id).returning(Comment.id)
+        """
+        Soft-deletes all comments on the task.
+
+        The number of deleted comments is the row count of the UPDATE, the ids
+        are not sent back. The rows are removed later by the purge job.
+        """
+        stmt = (
+            update(Comment)
+            .where(Comment.task_id == task_id, NOT_DELETED)
+            .values(deleted_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
         result = await db.execute(stmt)
-        deleted_count = len(result.scalars().all())
+        deleted_count = result.rowcount
+        await db.execute(delete(CommentCount).where(CommentCount.task_id == task_id))
         await db.commit()
         return deleted_count
+
+    @staticmethod
+    async def delete_comments_batch(db: AsyncSession, task_id: str, limit: int):
+        """
+        Deletes up to `limit` comments of the task, including the soft-deleted ones, in a short transaction.
+
+        Returns:
+            int: The number of deleted comments, less than `limit` once the task has no comments left.
+        """
+        batch = (
+            select(Comment.id)
+            .where(Comment.task_id == task_id)
+            .order_by(Comment.id)
+            .limit(limit)
+        )
+        stmt = (
+            delete(Comment)
+            .where(Comment.id.in_(batch))
+            .returning(Comment.deleted_at)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(stmt)
+        deleted = result.scalars().all()
+        if len(deleted) < limit:
+            await db.execute(delete(CommentCount).where(CommentCount.task_id == task_id))
+        else:
+            live_count = sum(deleted_at is None for deleted_at in deleted)
+            if live_count:
+                await CommentRepository._add_to_counts(db, {task_id: -live_count})
+        await db.commit()
+        return len(deleted)
+
+    @staticmethod
+    async def move_comments(db: AsyncSession, task_id: str, new_task_id: str):
+        """
+        Moves all comments of the task, including the soft-deleted ones, and its counter to another task ID.
+
+        Returns:
+            int: The number of moved comments, 0 if they were moved already.
+        """
+        result = await db.execute(
+            update(Comment)
+            .where(Comment.task_id == task_id)
+            .values(task_id=new_task_id)
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            update(CommentCount)
+            .where(CommentCount.task_id == task_id)
+            .values(task_id=new_task_id)
+        )
+        await db.commit()
+        return result.rowcount
+
+    @staticmethod
+    async def purge_deleted_comments(
+        db: AsyncSession, retention: timedelta, limit: int
+    ):
+        """
+        Removes up to `limit` comments soft-deleted more than `retention` ago in a short transaction.
+
+        Rows locked by other transactions are skipped, so the purge never waits for them.
+
+        Returns:
+            int: The number of removed comments.
+        """
+        batch = (
+            select(Comment.id)
+            .where(Comment.deleted_at < func.now() - retention)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            delete(Comment)
+            .where(Comment.id.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount
+
+    @staticmethod
+    async def _add_to_counts(db: AsyncSession, deltas: dict):
+        """Changes the numbers of comments of the tasks within the current transaction."""
+        stmt = pg_insert(CommentCount).values(
+            [{"task_id": task_id, "count": delta} for task_id, delta in deltas.items()]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CommentCount.task_id],
+            set_={"count": CommentCount.count + stmt.excluded.count},
+        )
+        await db.execute(stmt)
+
+    @staticmethod
+    async def get_counts(db: AsyncSession, task_ids: list[str]):
+        """Receives the numbers of comments of the tasks, tasks without comments are omitted."""
+        result = await db.execute(
+            select(CommentCount.task_id, CommentCount.count).where(
+                CommentCount.task_id.in_(task_ids)
+            )
+        )
+        return dict(result.all())
+
+    @staticmethod
+    async def reconcile_counts(db: AsyncSession):
+        """
+        Recalculates the numbers of comments of all the tasks from the comments table.
+
+        Only the drifted counters are rewritten, and the counters of tasks
+        without comments are removed. A counter changed by a concurrent
+        transaction since the totals were read is skipped until the next run.
+
+        Returns:
+            list [str]: identifiers of the tasks whose counters were fixed.
+        """
+        totals = (
+            select(Comment.task_id, func.count().label("total"))
+            .where(NOT_DELETED)
+            .group_by(Comment.task_id)
+            .subquery()
+        )
+        # The totals and the counters they are compared with come from one snapshot
+        drifted = await db.execute(
+            select(
+                func.coalesce(totals.c.task_id, CommentCount.task_id),
+                func.coalesce(totals.c.total, 0),
+                CommentCount.count,
+            )
+            .select_from(
+                totals.join(
+                    CommentCount,
+                    CommentCount.task_id == totals.c.task_id,
+                    full=True,
+                )
+            )
+            .where(
+                func.coalesce(totals.c.total, 0) != func.coalesce(CommentCount.count, 0)
+            )
+        )
+
+        fixed_task_ids = []
+        for task_id, total, seen in drifted.all():
+            if seen is None:
+                stmt = (
+                    pg_insert(CommentCount)
+                    .values(task_id=task_id, count=total)
+                    .on_conflict_do_nothing(index_elements=[CommentCount.task_id])
+                )
+            elif total == 0:
+                stmt = delete(CommentCount).where(
+                    CommentCount.task_id == task_id, CommentCount.count == seen
+                )
+            else:
+                stmt = (
+                    update(CommentCount)
+                    .where(CommentCount.task_id == task_id, CommentCount.count == seen)
+                    .values(count=total)
+                )
+            result = await db.execute(stmt)
+            if result.rowcount:
+                fixed_task_ids.append(task_id)
+        await db.commit()
+        return fixed_task_ids
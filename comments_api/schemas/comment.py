@@ -1,5 +1,8 @@
 import datetime
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, Field, TypeAdapter
+from settings import settings
 
 
 class CommentCreate(BaseModel):
@@ -20,6 +23,30 @@ class CommentCreate(BaseModel):
         orm_mode = True
 
 
+class CommentsBatchCreate(BaseModel):
+    """
+    Model for creating several comments at once, possibly for different tasks.
+
+    Attributes:
+    - Comments (List [CommentCreate]): Data for creating the comments.
+    """
+
+    comments: list[CommentCreate] = Field(
+        min_length=1, max_length=settings.COMMENTS_BATCH_MAX_SIZE
+    )
+
+
+class CommentsMove(BaseModel):
+    """
+    Model for moving the comments of a task to its new identifier.
+
+    Attributes:
+    - TASK_ID (str): the new identifier of the task.
+    """
+
+    task_id: str = Field(min_length=1)
+
+
 class CommentResponse(BaseModel):
     """
     Model for presenting a commentary in the answers of the API.
@@ -42,17 +69,118 @@ class CommentResponse(BaseModel):
         from_attributes = True
 
 
+# Validates / serializes lists of comments in a single pass
+CommentListAdapter = TypeAdapter(list[CommentResponse])
+
+
 class CommentsResponse(BaseModel):
     """
     Model for presenting a list of comments.
 
     Attributes:
     - Comments (List [commentRasponse]): List of comment objects.
+    - next_cursor (str | None): Cursor of the next page, None for the last / only page.
+    """
+
+    comments: list[CommentResponse]
+    next_cursor: str | None = None
+
+
+class TaskCommentsSummary(BaseModel):
     """
+    Model for presenting the comments of one task in a batch answer.
 
+    Attributes:
+    - TASK_ID (str): the identifier of the task.
+    - count (int): Number of comments for the task.
+    - Comments (List [commentRasponse]): The latest comments ordered by creation time.
+    """
+
+    task_id: str
+    count: int
     comments: list[CommentResponse]
 
 
+class TasksCommentsResponse(BaseModel):
+    """
+    Model for presenting the comments of several tasks.
+
+    Attributes:
+    - tasks (List [TaskCommentsSummary]): Comments of the tasks in the requested order.
+    """
+
+    tasks: list[TaskCommentsSummary]
+
+
+class CommentCountsResponse(BaseModel):
+    """
+    Model for presenting the number of comments of several tasks.
+
+    Attributes:
+    - counts (dict [str, int]): task ID -> number of comments.
+    """
+
+    counts: dict[str, int]
+
+
+class CommentSearchResult(CommentResponse):
+    """
+    Model for presenting a comment found by the search.
+
+    Attributes:
+    - rank (float): Relevance of the comment to the query.
+    """
+
+    rank: float
+
+
+class CommentSearchResponse(BaseModel):
+    """
+    Model for presenting a page of the search results.
+
+    Attributes:
+    - results (List [CommentSearchResult]): Found comments, the most relevant first.
+    - next_cursor (str | None): Cursor of the next page, None for the last page.
+    """
+
+    results: list[CommentSearchResult]
+    next_cursor: str | None = None
+
+
+class CommentEvent(BaseModel):
+    """
+    Model for presenting a change of a comment.
+
+    Attributes:
+    - ID (str): ID of the event in the stream.
+    - type (str): created, updated, deleted or cleared (all comments of the task removed).
+    - TASK_ID (str): the identifier of the task.
+    - Comment_id (int | None): Comment identifier, None for "cleared".
+    - Comment (CommentResponse | None): The comment after the change, None for removals.
+    """
+
+    id: str
+    type: Literal["created", "updated", "deleted", "cleared"]
+    task_id: str
+    comment_id: int | None = None
+    comment: CommentResponse | None = None
+
+
+class CommentEventsResponse(BaseModel):
+    """
+    Model for presenting the changes of comments.
+
+    Attributes:
+    - events (List [CommentEvent]): Changes in the order they happened.
+    - last_id (str): ID to pass as `after` to receive the next changes.
+    - truncated (bool): Changes may have been missed, the comments should be reloaded.
+    """
+
+    events: list[CommentEvent]
+    last_id: str
+    truncated: bool = False
+
+
 class CommentUpdate(BaseModel):
     """
     Model for updating the contents of the comment.
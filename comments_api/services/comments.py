@@ -1,6 +1,26 @@
+import asyncio
+import math
+import random
+
 from cache.comments import CommentCache
+from cache.counters import CommentCountCache
+from cache.ownership import OwnershipCache
+from events.comments import CommentEvents
+from redis.exceptions import LockError
 from repositories.comments import CommentRepository
-from schemas.comment import CommentCreate, CommentUpdate
+from schemas.comment import (
+    CommentCreate,
+    CommentListAdapter,
+    CommentResponse,
+    CommentUpdate,
+)
+from services.pagination import (
+    decode_cursor,
+    decode_search_cursor,
+    encode_cursor,
+    encode_search_cursor,
+)
+from settings import settings
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -26,13 +46,83 @@ class CommentService:
         await CommentCache.cache_comment(
             redis, new_comment.task_id, new_comment.id, new_comment
         )
+        await CommentCountCache.delete_count(redis, new_comment.task_id)
+        await CommentEvents.publish(
+            redis, CommentEvents.CREATED, new_comment.task_id, new_comment.id, new_comment
+        )
         return new_comment
 
+    @staticmethod
+    async def create_comments(db: AsyncSession, redis, comments: list[CommentCreate]):
+        """
+        Creates several comments at once and saves them in the database and cache.
+
+        Args:
+            DB (AsyncSession): Database session.
+            Redis: Client Redis for caching.
+            Comments (list [CommentCreate]): Data for creating the comments.
+
+        Returns:
+            List [comment]: New comments in the order of `comments`.
+        """
+        new_comments = await CommentRepository.create_comments(db, comments)
+        await CommentCache.cache_new_comments(redis, new_comments)
+        await CommentCountCache.delete_counts(
+            redis, {comment.task_id for comment in new_comments}
+        )
+        await CommentEvents.publish_created(redis, new_comments)
+        return new_comments
+
+    @staticmethod
+    async def get_comment_counts(db: AsyncSession, redis, task_ids: list[str]):
+        """
+        Receives the number of comments of each of the tasks without loading the comments.
+
+        Args:
+            DB (AsyncSession): Database session.
+            Redis: Client Redis for caching.
+            task_ids (list [str]): identifiers of the tasks.
+
+        Returns:
+            dict: task ID -> number of comments, in the order of `task_ids`.
+        """
+        counts = await CommentCountCache.get_counts(redis, task_ids)
+        missing = [task_id for task_id in task_ids if task_id not in counts]
+        if missing:
+            generations = await CommentCountCache.get_generations(redis, missing)
+            loaded = await CommentRepository.get_counts(db, missing)
+            loaded = {task_id: loaded.get(task_id, 0) for task_id in missing}
+            await CommentCountCache.set_counts(redis, loaded, generations)
+            counts.update(loaded)
+
+        return {task_id: counts[task_id] for task_id in task_ids}
+
+    @staticmethod
+    async def reconcile_comment_counts(db: AsyncSession, redis):
+        """
+        Fixes the drift of the comment counters in the database and drops the cached ones that were fixed.
+
+        Args:
+            DB (AsyncSession): Database session.
+            Redis: Client Redis for caching.
+        """
+        fixed_task_ids = await CommentRepository.reconcile_counts(db)
+        await CommentCountCache.delete_counts(redis, fixed_task_ids)
+
+    # Comment list loads in progress in this worker: task_id -> Future
+    _inflight: dict[str, asyncio.Future] = {}
+
     @staticmethod
     async def get_comments_by_task(db: AsyncSession, redis, task_id: str):
         """
         Receives all the comments for the task. Checks the cache, if there is no data, requests from the database.
 
+        Concurrent misses of the same task are coalesced: within a worker they
+        share one load, across workers only the holder of the Redis rebuild
+        lock queries the database while the others wait for the cache.
+        With `COMMENTS_EARLY_REFRESH_BETA` > 0 a hot cache is rebuilt shortly
+        before it expires by a single request chosen at random.
+
         Args:
             DB (AsyncSession): Database session.
             Redis: Client Redis for caching.
@@ -41,14 +131,236 @@ class CommentService:
         Returns:
             List [comment]: a list of comments for the task.
         """
-        cached_comments = await CommentCache.get_cached_comments(redis, task_id)
-        if cached_comments:
-            return [comment for comment in cached_comments.values()]
+        cached_comments, ttl = await CommentCache.get_cached_comments_with_ttl(
+            redis, task_id
+        )
+        if cached_comments is not None and not CommentService._should_refresh_early(
+            ttl
+        ):
+            return cached_comments
 
-        comments = await CommentRepository.get_comments(db, task_id)
-        for comment in comments:
-            await CommentCache.cache_comment(redis, task_id, comment.id, comment)
-        return comments
+        return await CommentService._load_comments_once(
+            db, redis, task_id, cached_comments
+        )
+
+    @staticmethod
+    async def get_comments_json(db: AsyncSession, redis, task_id: str) -> bytes:
+        """
+        Receives all the comments for the task as a serialized `CommentsResponse`.
+
+        On a cache hit the cached comment JSON is joined into the response as
+        is, without building Pydantic models.
+
+        Args:
+            DB (AsyncSession): Database session.
+            Redis: Client Redis for caching.
+            TASK_ID (str): the identifier of the task.
+
+        Returns:
+            bytes: JSON of the `CommentsResponse`.
+        """
+        payloads, ttl = await CommentCache.get_cached_payloads_with_ttl(redis, task_id)
+        if payloads is not None and not CommentService._should_refresh_early(ttl):
+            comments_json = ("[" + ",".join(payloads) + "]").encode()
+        else:
+            comments = await CommentService._load_comments_once(
+                db, redis, task_id, CommentCache.parse_comments(payloads)
+            )
+            comments_json = CommentListAdapter.dump_json(
+                CommentListAdapter.validate_python(comments, from_attributes=True)
+            )
+
+        return b'{"comments":' + comments_json + b',"next_cursor":null}'
+
+    @staticmethod
+    async def get_comments_page(
+        db: AsyncSession, redis, task_id: str, limit: int, cursor: str = None
+    ):
+        """
+        Receives one page of the comments for the task, ordered by (created_at, id).
+
+        The page is read from the cache by rank if the comments of the task
+        are cached, otherwise from the database by the (created_at, id) key.
+
+        Args:
+            DB (AsyncSession): Database session.
+            Redis: Client Redis for caching.
+            TASK_ID (str): the identifier of the task.
+            limit (int): maximum number of comments on the page.
+            cursor (str): cursor of the page, None for the first page.
+
+        RAISES:
+            ValueError: If the cursor is malformed.
+
+        Returns:
+            tuple: comments of the page and the cursor of the next page (None for the last page).
+        """
+        after = decode_cursor(cursor) if cursor else None
+        comments = await CommentCache.get_cached_page(
+            redis, task_id, after[1] if after else None, limit + 1
+        )
+        if comments is None:
+            comments = await CommentRepository.get_comments_page(
+                db, task_id, limit + 1, after
+            )
+        if len(comments) > limit:
+            return comments[:limit], encode_cursor(comments[limit - 1])
+        return comments, None
+
+    @staticmethod
+    async def get_tasks_summary(
+        db: AsyncSession, redis, task_ids: list[str], latest: int
+    ):
+        """
+        Receives the number of comments and the latest comments for each of the tasks.
+
+        The cached tasks are read with one Redis round trip, the rest with one
+        grouped query to the database.
+
+        Args:
+            DB (AsyncSession): Database session.
+            Redis: Client Redis for caching.
+            task_ids (list [str]): identifiers of the tasks.
+            latest (int): number of the latest comments per task.
+
+        Returns:
+            list [dict]: task_id, count and comments of each task in the order of `task_ids`.
+        """
+        summary = await CommentCache.get_cached_latest(redis, task_ids, latest)
+        missing = [task_id for task_id in task_ids if task_id not in summary]
+        if missing:
+            summary.update(
+                await CommentRepository.get_latest_comments(db, missing, latest)
+            )
+
+        tasks = []
+        for task_id in task_ids:
+            count, comments = summary.get(task_id, (0, []))
+            tasks.append({"task_id": task_id, "count": count, "comments": comments})
+        return tasks
+
+    @staticmethod
+    async def search_comments(
+        db: AsyncSession, task_ids: list[str], query: str, limit: int, cursor: str = None
+    ):
+        """
+        Searches the comments of the tasks, the most relevant first.
+
+        Args:
+            DB (AsyncSession): Database session.
+            task_ids (list [str]): identifiers of the tasks to search in.
+            query (str): search query, supports "quotes", OR and -exclusions.
+            limit (int): maximum number of results on the page.
+            cursor (str): cursor of the page, None for the first page.
+
+        RAISES:
+            ValueError: If the cursor is malformed.
+
+        Returns:
+            tuple: results of the page and the cursor of the next page (None for the last page).
+        """
+        after = decode_search_cursor(cursor) if cursor else None
+        if not task_ids:
+            return [], None
+
+        rows = await CommentRepository.search_comments(
+            db, task_ids, query, limit + 1, after
+        )
+        results = [
+            {**CommentResponse.model_validate(comment).model_dump(), "rank": rank}
+            for comment, rank in rows[:limit]
+        ]
+        if len(rows) > limit:
+            comment, rank = rows[limit - 1]
+            return results, encode_search_cursor(rank, comment.id)
+        return results, None
+
+    @staticmethod
+    async def stream_comments(db: AsyncSession, task_id: str):
+        """
+        Yields all the comments for the task as NDJSON lines without loading the whole list.
+
+        Args:
+            DB (AsyncSession): Database session, which must stay open while streaming.
+            TASK_ID (str): the identifier of the task.
+        """
+        async for comment in CommentRepository.stream_comments(
+            db, task_id, settings.COMMENTS_STREAM_BATCH_SIZE
+        ):
+            yield CommentResponse.model_validate(comment).model_dump_json() + "\n"
+
+    @staticmethod
+    def _should_refresh_early(ttl: float) -> bool:
+        """
+        Decides whether to rebuild the cache before it expires (XFetch algorithm).
+        """
+        beta = settings.COMMENTS_EARLY_REFRESH_BETA
+        if beta <= 0 or ttl < 0:
+            return False
+        gap = -settings.COMMENTS_EARLY_REFRESH_DELTA * beta * math.log(
+            1.0 - random.random()
+        )
+        return gap >= ttl
+
+    @staticmethod
+    async def _load_comments_once(
+        db: AsyncSession, redis, task_id: str, cached_comments
+    ):
+        """
+        Loads the comments of the task, sharing one load between concurrent requests of the worker.
+        """
+        future = CommentService._inflight.get(task_id)
+        if future is not None:
+            await asyncio.wait((future,))
+            if not future.cancelled():
+                return future.result()
+
+        future = asyncio.get_running_loop().create_future()
+        CommentService._inflight[task_id] = future
+        try:
+            comments = await CommentService._rebuild_cache(
+                db, redis, task_id, cached_comments
+            )
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()
+            raise
+        else:
+            future.set_result(comments)
+            return comments
+        finally:
+            CommentService._inflight.pop(task_id, None)
+
+    @staticmethod
+    async def _rebuild_cache(db: AsyncSession, redis, task_id: str, cached_comments):
+        """
+        Loads the comments from the database and caches them, if no other worker is already doing it.
+        """
+        lock = CommentCache.rebuild_lock(redis, task_id)
+
+        if not await lock.acquire():
+            if cached_comments is not None:
+                return cached_comments
+
+            cached_comments = await CommentCache.wait_for_rebuild(redis, task_id)
+            if cached_comments is not None:
+                return cached_comments
+            return await CommentRepository.get_comments(db, task_id)
+
+        try:
+            # Read first: a change committed during the query makes the result stale
+            generation = await CommentCache.get_generation(redis, task_id)
+            comments = await CommentRepository.get_comments(db, task_id)
+            await CommentCache.cache_comments(redis, task_id, comments, generation)
+            return comments
+        finally:
+            try:
+                await lock.release()
+            except LockError:
+                pass
 
     @staticmethod
     async def delete_comment(
@@ -66,9 +378,11 @@ class CommentService:
         Returns:
             Bool: Success of commentary removal.
         """
-        deleted = await CommentRepository.delete_comment(db, comment_id)
+        deleted = await CommentRepository.delete_comment(db, comment_id, task_id)
         if deleted:
             await CommentCache.delete_cached_comment(redis, task_id, comment_id)
+            await CommentCountCache.delete_count(redis, task_id)
+            await CommentEvents.publish(redis, CommentEvents.DELETED, task_id, comment_id)
             return True
         return False
 
@@ -87,11 +401,64 @@ class CommentService:
         """
         deleted_count = await CommentRepository.delete_all_comments_by_task(db, task_id)
         await CommentCache.delete_cached_comments_by_task(redis, task_id)
+        await CommentCountCache.delete_count(redis, task_id)
+        if deleted_count:
+            await CommentEvents.publish(redis, CommentEvents.CLEARED, task_id)
         return deleted_count
 
+    @staticmethod
+    async def purge_comments_by_task(
+        db: AsyncSession, redis, task_id: str, batch_size: int
+    ):
+        """
+        Removes the next batch of the comments of a deleted task from the database and cache.
+
+        Args:
+            DB (AsyncSession): Database session.
+            Redis: Client Redis for caching.
+            TASK_ID (str): the identifier of the task.
+            batch_size (int): maximum number of comments to remove.
+
+        Returns:
+            tuple: The number of removed comments and whether the task has comments left.
+        """
+        deleted_count = await CommentRepository.delete_comments_batch(
+            db, task_id, batch_size
+        )
+        remaining = deleted_count == batch_size
+        await CommentCache.delete_cached_comments_by_task(redis, task_id)
+        await CommentCountCache.delete_count(redis, task_id)
+        if not remaining:
+            await OwnershipCache.invalidate_task(redis, task_id)
+            await CommentEvents.publish(redis, CommentEvents.CLEARED, task_id)
+        return deleted_count, remaining
+
+    @staticmethod
+    async def move_comments(db: AsyncSession, redis, task_id: str, new_task_id: str):
+        """
+        Moves the comments of a task whose ID was reissued in the Django API.
+
+        Args:
+            DB (AsyncSession): Database session.
+            Redis: Client Redis for caching.
+            TASK_ID (str): the former identifier of the task.
+            new_task_id (str): the new identifier of the task.
+
+        Returns:
+            int: The number of moved comments.
+        """
+        moved_count = await CommentRepository.move_comments(db, task_id, new_task_id)
+        for cached_task_id in (task_id, new_task_id):
+            await CommentCache.delete_cached_comments_by_task(redis, cached_task_id)
+            await CommentCountCache.delete_count(redis, cached_task_id)
+            await OwnershipCache.invalidate_task(redis, cached_task_id)
+        if moved_count:
+            await CommentEvents.publish(redis, CommentEvents.CLEARED, task_id)
+        return moved_count
+
     @staticmethod
     async def update_comment(
-        db: AsyncSession, redis, comment_id: int, comment: CommentUpdate
+        db: AsyncSession, redis, comment_id: int, task_id: str, comment: CommentUpdate
     ):
         """
         Updates the contents of the comment and retains changes in the database and cache.
@@ -100,16 +467,24 @@ class CommentService:
             DB (AsyncSession): Database session.
             Redis: Client Redis for caching.
             Comment_id (int): Comment identifier.
+            TASK_ID (str): the identifier of the task the comment belongs to.
             Comment (CommentPdate): Data for updating the comment.
 
         Returns:
             Updated_comment (Comment): updated comment.
         """
         updated_comment = await CommentRepository.update_comment(
-            db, comment_id, comment.content
+            db, comment_id, task_id, comment.content
         )
         if updated_comment:
             await CommentCache.cache_comment(
                 redis, updated_comment.task_id, updated_comment.id, updated_comment
             )
+            await CommentEvents.publish(
+                redis,
+                CommentEvents.UPDATED,
+                updated_comment.task_id,
+                updated_comment.id,
+                updated_comment,
+            )
         return updated_comment
@@ -0,0 +1,72 @@
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(comment) -> str:
+    """
+    Encodes the (created_at, id) key of the comment into an opaque cursor.
+
+    Args:
+        Comment: The last comment of the page.
+
+    Returns:
+        str: URL-safe cursor of the next page.
+    """
+    key = json.dumps([comment.created_at.isoformat(), comment.id])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decodes the cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): cursor of the page.
+
+    RAISES:
+        ValueError: If the cursor is malformed.
+
+    Returns:
+        tuple: (created_at, id) key of the last comment of the previous page.
+    """
+    try:
+        created_at, comment_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(comment_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def encode_search_cursor(rank: float, comment_id: int) -> str:
+    """
+    Encodes the (rank, id) key of the last search result into an opaque cursor.
+
+    Args:
+        rank (float): Rank of the last result of the page.
+        comment_id (int): ID of the last result of the page.
+
+    Returns:
+        str: URL-safe cursor of the next page.
+    """
+    key = json.dumps([rank, comment_id])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, int]:
+    """
+    Decodes the cursor produced by `encode_search_cursor`.
+
+    Args:
+        cursor (str): cursor of the page.
+
+    RAISES:
+        ValueError: If the cursor is malformed.
+
+    Returns:
+        tuple: (rank, id) key of the last result of the previous page.
+    """
+    try:
+        rank, comment_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(comment_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
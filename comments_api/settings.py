@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import ValidationError
 from pydantic_settings import BaseSettings
 
@@ -8,12 +10,68 @@ class Settings(BaseSettings):
     DB_NAME: str
     DB_USER: str =  "postgres"
     DB_PASSWORD: str
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    DB_STATEMENT_TIMEOUT: int = 5000
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
 
     REDIS_HOST: str
     REDIS_PORT: int
     REDIS_TIMEOUT: int
+    REDIS_POOL_SIZE: int = 50
+    REDIS_POOL_TIMEOUT: float = 5.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 2.0
+
+    COMMENTS_EMPTY_CACHE_TTL: int = 300
+    COMMENTS_PAGE_DEFAULT_LIMIT: int = 50
+    COMMENTS_PAGE_MAX_LIMIT: int = 200
+    COMMENTS_STREAM_BATCH_SIZE: int = 500
+    COMMENTS_BATCH_MAX_SIZE: int = 1000
+    COMMENTS_BATCH_MAX_TASKS: int = 100
+    COMMENTS_BATCH_LATEST_DEFAULT: int = 3
+    COMMENTS_COUNTS_RECONCILE_INTERVAL: int = 3600
+    COMMENTS_SEARCH_DEFAULT_LIMIT: int = 20
+    COMMENTS_SEARCH_MAX_LIMIT: int = 100
+    COMMENTS_EVENTS_MAXLEN: int = 100000
+    COMMENTS_EVENTS_READ_COUNT: int = 100
+    COMMENTS_EVENTS_MAX_BLOCK_MS: int = 4000
+    COMMENTS_EVENTS_MAX_WAITERS: int = 20
+    COMMENTS_LIVE_QUEUE_SIZE: int = 100
+    COMMENTS_LIVE_HEARTBEAT: float = 15.0
+    COMMENTS_LOCK_TIMEOUT: float = 5.0
+    COMMENTS_LOCK_WAIT: float = 2.0
+    COMMENTS_LOCK_POLL_INTERVAL: float = 0.05
+    COMMENTS_EARLY_REFRESH_BETA: float = 0.0
+    COMMENTS_EARLY_REFRESH_DELTA: float = 0.1
 
     DJANGO_BACKEND_URL: str
+    DJANGO_HTTP2: bool = True
+    DJANGO_POOL_SIZE: int = 100
+    DJANGO_KEEPALIVE_CONNECTIONS: int = 20
+    DJANGO_TIMEOUT: float = 5.0
+
+    AUTH_MODE: Literal["remote", "jwt"] = "remote"
+    JWT_SIGNING_KEY: str = ""
+    JWT_ALGORITHM: str = "HS256"
+    JWT_USER_ID_CLAIM: str = "user_id"
+
+    OWNERSHIP_CACHE_TTL: int = 60
+    OWNERSHIP_NEGATIVE_CACHE_TTL: int = 10
+    OWNERSHIP_LOCAL_CACHE_TTL: int = 5
+    OWNERSHIP_LOCAL_CACHE_SIZE: int = 10000
+
+    SERVICE_TOKEN: str = ""
+    COMMENTS_PURGE_BATCH_SIZE: int = 1000
+    COMMENTS_PURGE_INTERVAL: int = 600
+    COMMENTS_PURGE_RETENTION: int = 3600
+    COMMENTS_PURGE_PAUSE: float = 0.1
+
     DEBUG: bool = True
 
     class Config:
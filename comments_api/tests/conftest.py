@@ -0,0 +1,14 @@
+import os
+
+# The settings are read at import, the services themselves are replaced in the tests
+for name, value in {
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "comments",
+    "DB_PASSWORD": "",
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "REDIS_TIMEOUT": "5",
+    "DJANGO_BACKEND_URL": "http://django:8000/api/",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,81 @@
+import asyncio
+
+import fakeredis
+from benchmarks.common import create_engine
+from cache.counters import CommentCountCache
+from models.comment import Base, Comment, CommentCount
+from repositories.comments import CommentRepository
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+def test_count_loaded_before_a_concurrent_change_is_not_cached():
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        generations = await CommentCountCache.get_generations(redis, ["t1", "t2"])
+        # A comment of t1 is created after its number was read from the database
+        await CommentCountCache.delete_count(redis, "t1")
+        await CommentCountCache.set_counts(redis, {"t1": 3, "t2": 5}, generations)
+
+        assert await CommentCountCache.get_counts(redis, ["t1", "t2"]) == {"t2": 5}
+
+        generations = await CommentCountCache.get_generations(redis, ["t1"])
+        await CommentCountCache.set_counts(redis, {"t1": 4}, generations)
+        assert await CommentCountCache.get_counts(redis, ["t1"]) == {"t1": 4}
+
+    asyncio.run(scenario())
+
+
+def test_reconcile_fixes_drifted_counters_and_skips_changed_ones():
+    async def scenario():
+        engine = create_engine()
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(engine, class_=AsyncSession)
+
+        async with sessions() as db:
+            db.add_all(
+                Comment(task_id=task_id, user_id=1, content="comment")
+                for task_id in ["ok", "ok", "drifted", "drifted", "missing", "changed"]
+            )
+            db.add_all(
+                [
+                    CommentCount(task_id="ok", count=2),
+                    CommentCount(task_id="drifted", count=5),
+                    CommentCount(task_id="empty", count=1),
+                    CommentCount(task_id="changed", count=7),
+                ]
+            )
+            await db.commit()
+
+        async with sessions() as db:
+            execute = db.execute
+
+            async def execute_after_change(stmt, *args, **kwargs):
+                if not getattr(execute_after_change, "changed", False):
+                    result = await execute(stmt, *args, **kwargs)
+                    execute_after_change.changed = True
+                    # A comment is created right after the totals are read
+                    async with sessions() as other:
+                        other.add(Comment(task_id="changed", user_id=1, content="new"))
+                        await other.execute(
+                            update(CommentCount)
+                            .where(CommentCount.task_id == "changed")
+                            .values(count=CommentCount.count + 1)
+                        )
+                        await other.commit()
+                    return result
+                return await execute(stmt, *args, **kwargs)
+
+            db.execute = execute_after_change
+            fixed = await CommentRepository.reconcile_counts(db)
+
+        async with sessions() as db:
+            result = await db.execute(select(CommentCount.task_id, CommentCount.count))
+            counts = dict(result.all())
+        await engine.dispose()
+
+        assert sorted(fixed) == ["drifted", "empty", "missing"]
+        assert counts == {"ok": 2, "drifted": 2, "missing": 1, "changed": 8}
+
+    asyncio.run(scenario())
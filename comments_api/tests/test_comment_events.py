@@ -0,0 +1,76 @@
+import asyncio
+
+import fakeredis
+import pytest
+from api import comments
+from events.comments import CommentEvents
+from fastapi import HTTPException
+
+
+def test_untrimmed_stream_is_not_truncated():
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        _, _, truncated = await CommentEvents.read(redis, ["task-1"], "0-0", 10, 0)
+        assert not truncated
+
+        await CommentEvents.publish(redis, "cleared", "task-1")
+        events, _, truncated = await CommentEvents.read(redis, ["task-1"], "0-0", 10, 0)
+        assert len(events) == 1
+        assert not truncated
+        await redis.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_trimmed_stream_is_truncated_before_its_first_entry():
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        for _ in range(3):
+            await CommentEvents.publish(redis, "cleared", "task-1")
+        entries = await redis.xrange(CommentEvents.KEY)
+        await redis.xtrim(CommentEvents.KEY, maxlen=1, approximate=False)
+
+        _, _, truncated = await CommentEvents.read(redis, ["task-1"], "0-0", 10, 0)
+        assert truncated
+        _, _, truncated = await CommentEvents.read(
+            redis, ["task-1"], entries[-1][0], 10, 0
+        )
+        assert not truncated
+        await redis.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_waiting_request_is_rejected_when_all_waiters_are_busy(monkeypatch):
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        waiters = asyncio.Semaphore(1)
+
+        async def check_tasks_ownership(*args):
+            return True
+
+        monkeypatch.setattr(comments, "check_tasks_ownership", check_tasks_ownership)
+
+        async def read(block_ms):
+            return await comments.read_comment_events(
+                task_ids=["task-1"],
+                after="0-0",
+                count=10,
+                block_ms=block_ms,
+                redis=redis,
+                blocking_redis=redis,
+                waiters=waiters,
+                user_token=None,
+                client=None,
+            )
+
+        async with waiters:
+            with pytest.raises(HTTPException) as error:
+                await read(100)
+            assert error.value.status_code == 503
+            # reads that do not wait do not need a waiter
+            assert (await read(0))["events"] == []
+        assert (await read(100))["events"] == []
+        await redis.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,64 @@
+import asyncio
+import datetime
+
+import fakeredis
+from cache.comments import CommentCache
+from repositories.comments import CommentRepository
+from schemas.comment import CommentResponse
+from services.comments import CommentService
+
+
+def make_comment(comment_id: int, task_id: str = "task-1") -> CommentResponse:
+    return CommentResponse(
+        id=comment_id,
+        task_id=task_id,
+        user_id=1,
+        content=f"comment {comment_id}",
+        created_at=datetime.datetime(2026, 1, 1) + datetime.timedelta(minutes=comment_id),
+    )
+
+
+def test_rebuild_drops_list_loaded_before_a_concurrent_create(monkeypatch):
+    async def get_comments(db, task_id):
+        # The comment is committed and written through while the query runs
+        await CommentCache.cache_comment(redis, task_id, 2, make_comment(2))
+        return [make_comment(1)]
+
+    async def scenario():
+        comments = await CommentService.get_comments_by_task(None, redis, "task-1")
+        assert [comment.id for comment in comments] == [1]
+        assert await CommentCache.get_cached_comments(redis, "task-1") is None
+
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(CommentRepository, "get_comments", get_comments)
+    asyncio.run(scenario())
+
+
+def test_rebuild_drops_empty_list_loaded_before_a_concurrent_create():
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        generation = await CommentCache.get_generation(redis, "task-1")
+        await CommentCache.cache_comment(redis, "task-1", 1, make_comment(1))
+
+        assert not await CommentCache.cache_comments(redis, "task-1", [], generation)
+        assert await CommentCache.get_cached_comments(redis, "task-1") is None
+
+    asyncio.run(scenario())
+
+
+def test_rebuild_caches_list_when_nothing_changed():
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        await CommentCache.delete_cached_comment(redis, "task-1", 3)
+        generation = await CommentCache.get_generation(redis, "task-1")
+
+        comments = [make_comment(1), make_comment(2)]
+        assert await CommentCache.cache_comments(redis, "task-1", comments, generation)
+        cached = await CommentCache.get_cached_comments(redis, "task-1")
+        assert [comment.id for comment in cached] == [1, 2]
+
+        await CommentCache.cache_comment(redis, "task-1", 3, make_comment(3))
+        cached = await CommentCache.get_cached_comments(redis, "task-1")
+        assert [comment.id for comment in cached] == [1, 2, 3]
+
+    asyncio.run(scenario())
@@ -0,0 +1,83 @@
+import asyncio
+
+import fakeredis
+from dependencies.auth import check_task_ownership
+from events.comments import CommentEvents
+from events.live import CommentEventsBroadcaster
+from main import app
+
+
+async def open_live(task_id: str, received: asyncio.Queue, disconnected: asyncio.Event):
+    """
+    Calls the `/live` endpoint as an ASGI server would, putting the chunks of the body into `received`.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": f"/comments/{task_id}/live",
+        "raw_path": f"/comments/{task_id}/live".encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"authorization", b"Bearer token")],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+        "app": app,
+    }
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            await received.put(message["status"])
+        elif message["type"] == "http.response.body":
+            await received.put(message.get("body", b""))
+
+    await app(scope, receive, send)
+
+
+async def receive_until(received: asyncio.Queue, marker: bytes) -> bytes:
+    body = b""
+    while marker not in body:
+        body += await asyncio.wait_for(received.get(), 5)
+    return body
+
+
+def test_live_receives_comment_events():
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        app.state.redis = redis
+        app.state.comment_events = broadcaster = CommentEventsBroadcaster(redis)
+        app.dependency_overrides[check_task_ownership] = lambda: True
+        broadcaster.start()
+
+        received, disconnected = asyncio.Queue(), asyncio.Event()
+        server = asyncio.create_task(open_live("task-1", received, disconnected))
+        try:
+            assert await asyncio.wait_for(received.get(), 5) == 200
+            while not broadcaster.stats()["subscribers"]:
+                await asyncio.sleep(0.01)
+
+            await CommentEvents.publish(redis, "cleared", "task-2")
+            await CommentEvents.publish(redis, "cleared", "task-1")
+            body = await receive_until(received, b"\n\n")
+
+            assert b"event: cleared\n" in body
+            assert b'"task_id":"task-1"' in body
+        finally:
+            disconnected.set()
+            await broadcaster.stop()
+            await asyncio.wait_for(server, 5)
+            app.dependency_overrides.clear()
+            await redis.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,18 @@
+import pytest
+from api.comments import parse_task_ids
+from fastapi import HTTPException
+from settings import settings
+
+
+def test_parse_task_ids_removes_repeated_tasks_keeping_order():
+    assert parse_task_ids(["b", "a", "b", "c", "a"]) == ["b", "a", "c"]
+
+
+def test_parse_task_ids_counts_distinct_tasks():
+    limit = settings.COMMENTS_BATCH_MAX_TASKS
+    task_ids = [f"task-{i % limit}" for i in range(limit * 3)]
+    assert len(parse_task_ids(task_ids)) == limit
+
+    with pytest.raises(HTTPException) as error:
+        parse_task_ids(f"task-{i}" for i in range(limit + 1))
+    assert error.value.status_code == 400
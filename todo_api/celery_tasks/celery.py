@@ -9,7 +9,7 @@ app = Celery(
     'tasks',
     broker=f'redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_PORT')}/0',
     backend=f'redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_PORT')}/0',
-    include=['celery_tasks.notifications'],
+    include=['celery_tasks.notifications', 'celery_tasks.comments'],
 )
 app.conf.broker_connection_retry_on_startup = True
 app.conf.timezone = settings.TIME_ZONE
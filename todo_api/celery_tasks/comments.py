@@ -0,0 +1,51 @@
+import logging
+
+import httpx
+from celery import shared_task
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CommentsServiceError(Exception):
+    """
+    The comments microservice failed to handle a request, it may succeed later.
+    """
+
+
+@shared_task(
+    bind=True,
+    # only failures of the network and of the service are retried,
+    # a rejected request (4xx) would be rejected again
+    autoretry_for=(httpx.TransportError, CommentsServiceError),
+    max_retries=8,
+    retry_backoff=True,
+    retry_backoff_max=600,
+)
+def delete_task_comments(self, task_id):
+    """
+    Removes the comments of a deleted task in the comments microservice.
+
+    Comments are removed in batches of `COMMENTS_PURGE_BATCH_SIZE`, each in its
+    own request, so a retry continues from the batch that failed.
+    """
+    url = f"{settings.COMMENTS_API_URL}internal/tasks/{task_id}/comments"
+    headers = {"X-Service-Token": settings.COMMENTS_SERVICE_TOKEN}
+    params = {"batch_size": settings.COMMENTS_PURGE_BATCH_SIZE}
+
+    deleted = 0
+    with httpx.Client(headers=headers, timeout=10) as client:
+        while True:
+            response = client.delete(url, params=params)
+            if response.is_server_error:
+                raise CommentsServiceError(
+                    f"Сервис комментариев ответил {response.status_code}"
+                )
+            response.raise_for_status()
+            result = response.json()
+            deleted += result["deleted"]
+            if not result["remaining"]:
+                break
+
+    logger.info(f"Удалено {deleted} комментариев задачи {task_id}")
+    return deleted
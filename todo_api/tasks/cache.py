@@ -0,0 +1,149 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Resets collected by `deferred_cache_reset` in the current thread
+_deferred = threading.local()
+
+
+def get_list_version(user_id):
+    """
+    Returns the version of the user's task list the cache entries are keyed by.
+
+    :param user_id: ID of the user.
+    """
+    key = settings.TASK_CACHE_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        # Starting from the clock, a counter lost from the cache never
+        # repeats a version whose list may still be cached
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_list_version(user_id):
+    """
+    Moves the user to a new version of the task list, so the cached one is no longer used.
+
+    :param user_id: ID of the user whose tasks have changed.
+    """
+    key = settings.TASK_CACHE_VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+        cache.incr(key)
+
+
+def list_cache_key(user_id, version):
+    return settings.TASK_LIST_CACHE_KEY.format(user_id=user_id, version=version)
+
+
+def task_cache_key(task_id):
+    return settings.TASK_ITEM_CACHE_KEY.format(task_id=task_id)
+
+
+def get_cached_list(user_id):
+    """
+    Receives the rendered task list of the user from the cache.
+
+    :param user_id: ID of the user.
+    :return: (version, JSON bytes or None if the list of this version is not cached)
+    """
+    version = get_list_version(user_id)
+    return version, cache.get(list_cache_key(user_id, version))
+
+
+def cache_list(user_id, version, content):
+    """
+    Caches the rendered task list of the user.
+
+    :param user_id: ID of the user.
+    :param version: version of the list read before the tasks were loaded,
+        so that a list rendered from stale data is not stored as the current one.
+    :param content: JSON bytes of the response.
+    """
+    cache.set(
+        list_cache_key(user_id, version), content, timeout=settings.TASK_CACHE_TIMEOUT
+    )
+
+
+def get_cached_tasks(task_ids):
+    """
+    Receives the rendered tasks from the cache with one round trip.
+
+    :param task_ids: IDs of the tasks.
+    :return: {task ID: JSON bytes} only for the cached tasks
+    """
+    keys = {task_cache_key(task_id): task_id for task_id in task_ids}
+    return {keys[key]: content for key, content in cache.get_many(keys).items()}
+
+
+def cache_tasks(rendered_tasks):
+    """
+    Caches the rendered tasks, the parts the task lists are assembled from.
+
+    :param rendered_tasks: {task ID: JSON bytes}
+    """
+    cache.set_many(
+        {
+            task_cache_key(task_id): content
+            for task_id, content in rendered_tasks.items()
+        },
+        timeout=settings.TASK_CACHE_TIMEOUT,
+    )
+
+
+def reset_tasks_cache(tasks):
+    """
+    Removes the cache of the changed tasks and the task lists of their owners.
+
+    The lists are invalidated by the version bump, other tasks of the users
+    stay cached and are reused to assemble the new lists.
+
+    :param tasks: (task ID, user ID) pairs of the changed tasks.
+    """
+    tasks = list(tasks)
+    cache.delete_many([task_cache_key(task_id) for task_id, _ in tasks])
+    for user_id in {user_id for _, user_id in tasks}:
+        bump_list_version(user_id)
+
+
+def reset_cache_on_commit(tasks):
+    """
+    Resets the cache of the tasks once the change is committed.
+
+    Until then concurrent requests still read the old rows, so the cache
+    filled by them stays valid.
+
+    :param tasks: (task ID, user ID) pairs of the changed tasks.
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return
+
+    collected = getattr(_deferred, "tasks", None)
+    if collected is not None:
+        collected.update(tasks)
+    else:
+        transaction.on_commit(lambda: reset_tasks_cache(tasks))
+
+
+@contextmanager
+def deferred_cache_reset():
+    """
+    Collects the cache resets of the changes made inside (e.g. by the signals
+    of a bulk delete) into one reset on commit.
+    """
+    _deferred.tasks = collected = set()
+    try:
+        yield
+    finally:
+        _deferred.tasks = None
+    if collected:
+        transaction.on_commit(lambda: reset_tasks_cache(collected))
@@ -1,20 +1,48 @@
 import hashlib
+import os
+import threading
 import time
 
 from django.db import models
 
+# Crockford's Base32: digits and upper-case letters without I, L, O and U,
+# whose order matches the byte order, so the keys sort by the time
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+def encode_pk(timestamp_ms, randomness):
+    """
+    Encodes a 48-bit time in milliseconds and 80 random bits as a 26-character ULID.
+    """
+    value = (timestamp_ms << 80) | randomness
+    return "".join(ALPHABET[(value >> shift) & 31] for shift in range(125, -1, -5))
+
 
 class HashAutoField(models.CharField):
     """
-    The custom field of the model that generates a unique hash as a primary key.
+    The custom field of the model that generates a unique key as a primary key.
     Used to automatically create unique values of the primary key.
 
+    The keys are ULIDs: the time of creation in milliseconds followed by random
+    bits, so the new rows are appended to the end of the index, and keys
+    generated at the same time by different processes do not collide. Keys
+    issued before (36-character hashes) stay valid, see the
+    `reissue_legacy_pks` command to replace them.
+
     Attributes:
         - Blank: The value can be empty.
         - Unique: The value should be unique.
         - Primary_key: This field is the primary key.
+        - Max_length: Fits the legacy hashes as well as the 26-character ULIDs.
     """
 
+    PK_LENGTH = 26
+    LEGACY_PK_LENGTH = 36
+
+    _lock = threading.Lock()
+    _last_timestamp = 0
+    _last_randomness = 0
+
     def __init__(self, *args, **kwargs):
         """
         Field initialization.
@@ -22,18 +50,19 @@ class HashAutoField(models.CharField):
         kwargs['blank'] = True
         kwargs['unique'] = True
         kwargs['primary_key'] = True
+        kwargs.setdefault('max_length', self.LEGACY_PK_LENGTH)
         super().__init__(*args, **kwargs)
 
     def pre_save(self, model_instance, add):
         """
-        Generates a hash-meaning before preserving the object of the model.
+        Generates a key before preserving the object of the model.
 
         Parameters:
             Model_instance (Models.model): A copy of the model to which the field is attached.
             Add (Bool): a flag indicating that the object is added to the database.
 
         Returns:
-            STR: Hesh value for the primary key.
+            STR: the value of the primary key.
         """
         value = getattr(model_instance, self.attname)
         if not value and add:
@@ -41,16 +70,58 @@ class HashAutoField(models.CharField):
             setattr(model_instance, self.attname, value)
         return value
 
-    @staticmethod
-    def generate_pk(instance):
+    @classmethod
+    def generate_pk(cls, instance=None):
         """
-        Generates a unique hash for the primary key.
+        Generates a unique time-ordered key for the primary key.
+
+        Within one millisecond the random part of the previous key is
+        incremented, so the keys of a process (e.g. of a `bulk_create`) keep
+        the order they were generated in.
 
         Parameters:
             Instance (Models.model): A copy of the model for which the key is generated.
 
         Returns:
-            STR: a unique hash consisting of 36 characters.
+            STR: a unique key consisting of 26 characters.
+        """
+        with cls._lock:
+            timestamp = time.time_ns() // 1_000_000
+            if timestamp <= cls._last_timestamp:
+                # Same millisecond, or the clock went back
+                timestamp = cls._last_timestamp
+                randomness = cls._last_randomness + 1
+                if randomness >> 80:
+                    timestamp, randomness = timestamp + 1, 0
+            else:
+                randomness = int.from_bytes(os.urandom(10), "big")
+            cls._last_timestamp, cls._last_randomness = timestamp, randomness
+        return encode_pk(timestamp, randomness)
+
+    @classmethod
+    def reissue_pk(cls, legacy_pk, created_at=None):
+        """
+        Derives the key replacing a legacy one.
+
+        The same legacy key always gives the same new one, so an interrupted
+        migration can be repeated.
+
+        Parameters:
+            Legacy_pk (str): the legacy 36-character key.
+            Created_at (datetime): the time of creation of the row, if it is known.
+
+        Returns:
+            STR: a key consisting of 26 characters.
         """
-        pk_template = f"{instance.__class__.__name__}_{time.time()}"
-        return hashlib.sha256(pk_template.encode()).hexdigest()[:36]
+        timestamp = int(created_at.timestamp() * 1000) if created_at else 0
+        digest = hashlib.sha256(legacy_pk.encode()).digest()
+        return encode_pk(timestamp, int.from_bytes(digest[:10], "big"))
+
+    @classmethod
+    def _reset_after_fork(cls):
+        cls._lock = threading.Lock()
+        cls._last_timestamp = cls._last_randomness = 0
+
+
+# A forked worker must not continue the sequence of its parent
+os.register_at_fork(after_in_child=HashAutoField._reset_after_fork)
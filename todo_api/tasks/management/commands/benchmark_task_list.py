@@ -0,0 +1,182 @@
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils.timezone import now
+from rest_framework.test import APIRequestFactory, force_authenticate
+from tasks.cache import reset_tasks_cache
+from tasks.models import Category, Task
+from tasks.views import TaskViewSet
+
+CATEGORIES = [f"Benchmark {i}" for i in range(10)]
+
+
+def summarize(timings):
+    """
+    Returns mean / p50 / p99 of the timings (in seconds) in milliseconds.
+    """
+    timings_ms = sorted(t * 1000 for t in timings)
+    return {
+        "mean_ms": round(statistics.fmean(timings_ms), 2),
+        "p50_ms": round(timings_ms[len(timings_ms) // 2], 2),
+        "p99_ms": round(timings_ms[max(int(len(timings_ms) * 0.99) - 1, 0)], 2),
+    }
+
+
+class Command(BaseCommand):
+    """
+    Measures the task list of a synthetic user with many tasks.
+
+    The tasks are inserted with `bulk_create` and removed afterwards (unless
+    --keep). The requests go through `TaskViewSet` without throttling. For
+    a meaningful result run it against PostgreSQL with the migrations applied.
+    """
+
+    help = "Measures the latency of the task list of a synthetic user with many tasks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--full-repeat",
+            type=int,
+            default=3,
+            help="repeats of the unpaginated list, which renders every task",
+        )
+        parser.add_argument("--limit", type=int, default=50)
+        parser.add_argument("--deep-page", type=int, default=100)
+        parser.add_argument("--keep", action="store_true", help="keep the generated tasks")
+        parser.add_argument("--output", help="path of the JSON file with the results")
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username=f"benchmark-{uuid.uuid4().hex[:8]}")
+        started = time.perf_counter()
+        task_ids = self.populate(user, options["tasks"])
+        results = {"populate_s": round(time.perf_counter() - started, 1)}
+
+        view = TaskViewSet.as_view({"get": "list"}, throttle_classes=[])
+        factory = APIRequestFactory()
+
+        def get(params):
+            request = factory.get("/api/tasks", params)
+            force_authenticate(request, user=user)
+            response = view(request)
+            assert response.status_code == 200, response.status_code
+            return json.loads(response.content)
+
+        def measure(params, repeat, prepare=None):
+            timings = []
+            for _ in range(repeat):
+                if prepare is not None:
+                    prepare()
+                started = time.perf_counter()
+                get(params)
+                timings.append(time.perf_counter() - started)
+            return summarize(timings)
+
+        def deep_cursor(params):
+            cursor = None
+            for _ in range(options["deep_page"] - 1):
+                cursor = get({**params, **({"cursor": cursor} if cursor else {})})[
+                    "next_cursor"
+                ]
+            return cursor
+
+        limit = {"limit": options["limit"]}
+        today = now()
+        try:
+            results["full_cold"] = measure(
+                {},
+                options["full_repeat"],
+                prepare=lambda: reset_tasks_cache((task_id, user.id) for task_id in task_ids),
+            )
+            results["full_warm"] = measure({}, options["full_repeat"])
+            results["first_page"] = measure(limit, options["repeat"])
+            results["deep_page"] = measure(
+                {**limit, "cursor": deep_cursor(limit)}, options["repeat"]
+            )
+            results["status"] = measure({**limit, "status": "IN_PROGRESS"}, options["repeat"])
+            results["category"] = measure({**limit, "category": CATEGORIES[0]}, options["repeat"])
+            results["due_range"] = measure(
+                {
+                    **limit,
+                    "due_after": today.isoformat(),
+                    "due_before": (today + timedelta(days=7)).isoformat(),
+                },
+                options["repeat"],
+            )
+            results["title"] = measure({**limit, "ordering": "title"}, options["repeat"])
+        finally:
+            if not options["keep"]:
+                self.cleanup(user, task_ids)
+
+        for name, stats in results.items():
+            self.stdout.write(f"{name:<12} {stats}")
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+
+    def populate(self, user, count, batch_size=5000):
+        """
+        Inserts the tasks of the user with the statuses, dates and categories spread evenly.
+
+        :return: IDs of the tasks
+        """
+        categories = [
+            Category.objects.get_or_create(name=name)[0] for name in CATEGORIES
+        ]
+        statuses = Task.Status.values
+        today = now()
+        task_ids = []
+        with transaction.atomic():
+            for start in range(0, count, batch_size):
+                tasks = [
+                    Task(
+                        id=uuid.uuid4().hex,
+                        title=f"Task {i}",
+                        user=user,
+                        status=statuses[i % len(statuses)],
+                        due_date=(
+                            None
+                            if i % 10 == 0
+                            else today + timedelta(minutes=random.randint(-525_600, 525_600))
+                        ),
+                    )
+                    for i in range(start, min(start + batch_size, count))
+                ]
+                Task.objects.bulk_create(tasks)
+                Task.categories.through.objects.bulk_create(
+                    Task.categories.through(
+                        task_id=task.id, category_id=categories[i % len(categories)].id
+                    )
+                    for i, task in enumerate(tasks)
+                    if i % 3 == 0
+                )
+                task_ids += [task.id for task in tasks]
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {Task._meta.db_table}")
+                cursor.execute(f"ANALYZE {Task.categories.through._meta.db_table}")
+        return task_ids
+
+    def cleanup(self, user, task_ids):
+        """
+        Removes the tasks without the per-task signals, there are no comments to delete.
+        """
+        through = Task.categories.through._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {through} WHERE task_id IN "
+                f"(SELECT id FROM {Task._meta.db_table} WHERE user_id = %s)",
+                [user.id],
+            )
+            cursor.execute(f"DELETE FROM {Task._meta.db_table} WHERE user_id = %s", [user.id])
+        user.delete()
+        reset_tasks_cache((task_id, user.id) for task_id in task_ids)
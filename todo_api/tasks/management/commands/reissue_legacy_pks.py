@@ -0,0 +1,121 @@
+import logging
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.functions import Length
+from tasks.cache import reset_tasks_cache
+from tasks.fields import HashAutoField
+from tasks.models import Category, Task
+from users.models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+TaskCategories = Task.categories.through
+
+
+class Command(BaseCommand):
+    """
+    Replaces the legacy 36-character hash primary keys with time-ordered ULIDs.
+
+    The new key is derived from the legacy one (and the time of creation of
+    tasks and profiles), so the command can be interrupted and run again.
+    The comments of each task are moved to its new ID in the comments
+    microservice before the task itself, so it is best run while the users are
+    inactive. The links to the tasks in the old messages of the bot stop working.
+    """
+
+    help = "Replaces the legacy hash primary keys of tasks, categories and profiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--models",
+            nargs="+",
+            choices=["category", "userprofile", "task"],
+            default=["category", "userprofile", "task"],
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="only count the legacy keys"
+        )
+
+    def handle(self, *args, **options):
+        reissuers = {
+            "category": (Category.objects.all(), self.reissue_categories),
+            "userprofile": (
+                UserProfile.objects.select_related("user"),
+                self.reissue_profiles,
+            ),
+            "task": (Task.objects.all(), self.reissue_tasks),
+        }
+        for name in options["models"]:
+            queryset, reissue = reissuers[name]
+            legacy = self.legacy_rows(queryset)
+            if options["dry_run"]:
+                self.stdout.write(f"{name}: {legacy.count()} legacy keys")
+                continue
+
+            total = 0
+            while batch := list(legacy[: options["batch_size"]]):
+                reissue(batch)
+                total += len(batch)
+                self.stdout.write(f"{name}: {total} keys reissued")
+
+    @staticmethod
+    def legacy_rows(queryset):
+        return queryset.annotate(pk_length=Length("id")).exclude(
+            pk_length=HashAutoField.PK_LENGTH
+        )
+
+    def reissue_categories(self, categories):
+        with transaction.atomic():
+            for category in categories:
+                new_id = HashAutoField.reissue_pk(category.id)
+                tasks = list(category.tasks.values_list("id", "user_id"))
+                # The foreign keys are checked at the commit, after both updates
+                Category.objects.filter(id=category.id).update(id=new_id)
+                TaskCategories.objects.filter(category_id=category.id).update(
+                    category_id=new_id
+                )
+                transaction.on_commit(lambda tasks=tasks: reset_tasks_cache(tasks))
+
+    def reissue_profiles(self, profiles):
+        with transaction.atomic():
+            for profile in profiles:
+                new_id = HashAutoField.reissue_pk(profile.id, profile.user.date_joined)
+                UserProfile.objects.filter(id=profile.id).update(id=new_id)
+
+    def reissue_tasks(self, tasks):
+        moves = {task.id: HashAutoField.reissue_pk(task.id, task.created_at) for task in tasks}
+        self.move_comments(moves)
+
+        with transaction.atomic():
+            for old_id, new_id in moves.items():
+                Task.objects.filter(id=old_id).update(id=new_id)
+                TaskCategories.objects.filter(task_id=old_id).update(task_id=new_id)
+
+            changed = [(task.id, task.user_id) for task in tasks]
+            changed += [(moves[task.id], task.user_id) for task in tasks]
+            transaction.on_commit(lambda: reset_tasks_cache(changed))
+
+    @staticmethod
+    def move_comments(moves):
+        """
+        Moves the comments of the tasks to their new IDs in the comments microservice.
+
+        Runs before the tasks are updated: if it fails, the tasks of the batch
+        keep their legacy keys (those whose comments were moved show none) until
+        the command is run again, and moving the comments again is a no-op.
+        """
+        headers = {"X-Service-Token": settings.COMMENTS_SERVICE_TOKEN}
+        with httpx.Client(headers=headers, timeout=10) as client:
+            for old_id, new_id in moves.items():
+                response = client.post(
+                    f"{settings.COMMENTS_API_URL}internal/tasks/{old_id}/comments/move",
+                    json={"task_id": new_id},
+                )
+                response.raise_for_status()
+                moved = response.json()["moved"]
+                if moved:
+                    logger.info(f"Перенесено {moved} комментариев задачи {old_id} в {new_id}")
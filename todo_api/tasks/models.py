@@ -40,3 +40,11 @@ class Task(models.Model):
         verbose_name_plural = 'Tasks'
         verbose_name = 'Task'
         ordering = ['-due_date']
+        # Filters and orderings of the paginated task list (see tasks/pagination.py)
+        indexes = [
+            models.Index(
+                fields=['user', 'status', 'due_date'], name='task_user_status_due_idx'
+            ),
+            models.Index(fields=['user', 'due_date'], name='task_user_due_idx'),
+            models.Index(fields=['user', 'title'], name='task_user_title_idx'),
+        ]
@@ -0,0 +1,114 @@
+import base64
+import binascii
+import json
+
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+# Orderings of the task list, each backed by an index starting with the user
+ORDERINGS = ("-due_date", "due_date", "title", "-title")
+DEFAULT_ORDERING = "-due_date"
+
+INVALID_CURSOR = ValidationError({"cursor": ["Неверный курсор."]})
+
+
+def _split(ordering):
+    return ordering.lstrip("-"), ordering.startswith("-")
+
+
+def order_tasks(queryset, ordering):
+    """
+    Orders the tasks for the keyset pagination, the ID breaks the ties.
+
+    Empty values go first in descending and last in ascending order, as in
+    the PostgreSQL indexes, so the index can be scanned in both directions.
+    """
+    field, descending = _split(ordering)
+    if descending:
+        return queryset.order_by(F(field).desc(nulls_first=True), "-id")
+    return queryset.order_by(F(field).asc(nulls_last=True), "id")
+
+
+def tasks_after(queryset, ordering, value, task_id):
+    """
+    Filters the tasks following the (value, ID) position in the given ordering.
+
+    The redundant bound on the field alone lets the index range scan start
+    right at the position instead of skipping the previous pages.
+    """
+    field, descending = _split(ordering)
+    lookup = "lt" if descending else "gt"
+    bound = "lte" if descending else "gte"
+
+    if value is None:
+        following = Q(**{f"{field}__isnull": True, f"id__{lookup}": task_id})
+        if descending:
+            following |= Q(**{f"{field}__isnull": False})
+        return queryset.filter(following)
+
+    following = Q(**{f"{field}__{bound}": value}) & (
+        Q(**{f"{field}__{lookup}": value}) | Q(**{field: value, f"id__{lookup}": task_id})
+    )
+    if not descending:
+        following |= Q(**{f"{field}__isnull": True})
+    return queryset.filter(following)
+
+
+def encode_cursor(ordering, value, task_id):
+    """
+    Encodes the position after the last task of the page.
+
+    :return: opaque URL-safe string to pass as `cursor` for the next page
+    """
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    payload = json.dumps({"ordering": ordering, "value": value, "id": task_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, ordering):
+    """
+    Decodes the position encoded by `encode_cursor`.
+
+    :return: (value, task ID)
+    :raises ValidationError: if the cursor is malformed or made for another ordering
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value, task_id = position["value"], str(position["id"])
+        # both the title and the due date are encoded as strings
+        if position["ordering"] != ordering or not isinstance(value, str | None):
+            raise INVALID_CURSOR
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise INVALID_CURSOR
+
+    if value is not None and _split(ordering)[0] == "due_date":
+        try:
+            value = parse_datetime(value)
+        except ValueError:
+            # well formatted, but not a valid date
+            raise INVALID_CURSOR
+        if value is None:
+            raise INVALID_CURSOR
+    return value, task_id
+
+
+def paginate_tasks(queryset, ordering, limit, cursor=None):
+    """
+    Selects one page of the tasks with the keyset pagination.
+
+    :return: (IDs of the tasks of the page, cursor of the next page or None)
+    """
+    field, _ = _split(ordering)
+    queryset = order_tasks(queryset, ordering)
+    if cursor:
+        queryset = tasks_after(queryset, ordering, *decode_cursor(cursor, ordering))
+
+    rows = list(queryset.values_list("id", field)[: limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        task_id, value = rows[-1]
+        next_cursor = encode_cursor(ordering, value, task_id)
+    return [task_id for task_id, _ in rows], next_cursor
@@ -1,7 +1,16 @@
 import logging
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
 from django.utils.timezone import now
 from rest_framework import serializers
+from tasks.cache import reset_cache_on_commit
 from tasks.models import Category, Task
+from tasks.pagination import DEFAULT_ORDERING, ORDERINGS
+
+TaskCategories = Task.categories.through
+
+TITLE_TAKEN = "Задача с таким названием уже существует."
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -12,6 +21,121 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ["id", "name"]
 
 
+class TaskListSerializer(serializers.ListSerializer):
+    """
+    The serializer for a batch of tasks.
+
+    - Checks the uniqueness of the names for the whole batch with one query.
+    - Creates the tasks with `bulk_create` and updates them with `bulk_update`.
+    - Attaches the categories with one insert into the table of the relation.
+    - Resets the cache of the tasks once for the batch.
+    """
+
+    def run_child_validation(self, data):
+        """Validates an item of the batch against the task it updates, if any."""
+        if self.instance is not None:
+            if not hasattr(self, "_tasks"):
+                self._tasks = {task.id: task for task in self.instance}
+            if isinstance(data, dict):
+                # The ID only identifies the task, it is not validated nor changed
+                data = data.copy()
+                self.child.instance = self._tasks.get(data.pop("id", None))
+            else:
+                self.child.instance = None
+        return super().run_child_validation(data)
+
+    def to_internal_value(self, data):
+        """
+        Checks the uniqueness of the names of the tasks within the batch and for the user.
+
+        The errors are returned per task, as the errors of the fields.
+        """
+        attrs = super().to_internal_value(data)
+        user = self.context["request"].user
+        tasks = self.instance or [None] * len(attrs)
+        titles = Counter(
+            item["title"] if "title" in item else task.title
+            for item, task in zip(attrs, tasks)
+        )
+        taken_titles = set(
+            Task.objects.filter(
+                user=user, title__in=[item["title"] for item in attrs if "title" in item]
+            )
+            .exclude(id__in=[task.id for task in tasks if task])
+            .values_list("title", flat=True)
+        )
+
+        errors = []
+        for item in attrs:
+            title = item.get("title")
+            if title in taken_titles:
+                errors.append({"title": [TITLE_TAKEN]})
+            elif title is not None and titles[title] > 1:
+                errors.append({"title": ["Название повторяется в запросе."]})
+            else:
+                errors.append({})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data):
+        """Creates the tasks with their categories."""
+        category_names = [item.pop("categories", []) for item in validated_data]
+
+        with transaction.atomic():
+            categories = self.child.get_or_create_categories(
+                {name for names in category_names for name in names}
+            )
+            tasks = Task.objects.bulk_create(Task(**item) for item in validated_data)
+            self.attach_categories(tasks, category_names, categories)
+            reset_cache_on_commit((task.id, task.user_id) for task in tasks)
+        return tasks
+
+    def update(self, instance, validated_data):
+        """Updates the tasks, replacing the categories of those the categories are passed for."""
+        fields = set()
+        categorized_tasks, category_names = [], []
+        for task, item in zip(instance, validated_data):
+            if "categories" in item:
+                categorized_tasks.append(task)
+                category_names.append(item.pop("categories"))
+            for field, value in item.items():
+                setattr(task, field, value)
+                fields.add(field)
+
+        with transaction.atomic():
+            categories = self.child.get_or_create_categories(
+                {name for names in category_names for name in names}
+            )
+            if fields:
+                Task.objects.bulk_update(instance, fields)
+            if categorized_tasks:
+                TaskCategories.objects.filter(
+                    task_id__in=[task.id for task in categorized_tasks]
+                ).delete()
+                self.attach_categories(categorized_tasks, category_names, categories)
+            reset_cache_on_commit((task.id, task.user_id) for task in instance)
+        return instance
+
+    @staticmethod
+    def attach_categories(tasks, category_names, categories):
+        """
+        Links the tasks to their categories with one insert.
+
+        :param category_names: names of the categories of each task.
+        :param categories: the categories with all these names.
+        """
+        categories = {category.name: category for category in categories}
+        TaskCategories.objects.bulk_create(
+            TaskCategories(task_id=task.id, category_id=categories[name].id)
+            for task, names in zip(tasks, category_names)
+            for name in dict.fromkeys(names)
+        )
+        for task in tasks:
+            # The categories attached above are not known to the objects
+            getattr(task, "_prefetched_objects_cache", {}).pop("categories", None)
+
+
 class TaskSerializer(serializers.ModelSerializer):
     """
     The serializer for a task model.
@@ -42,16 +166,22 @@ class TaskSerializer(serializers.ModelSerializer):
             "due_date",
             "status",
         ]
+        list_serializer_class = TaskListSerializer
 
     def validate_title(self, value):
-        """Checks the uniqueness of the name of the problem for the user."""
+        """
+        Checks the uniqueness of the name of the problem for the user.
+
+        In a batch it is checked for all the tasks at once by `TaskListSerializer`.
+        """
+        if isinstance(self.parent, serializers.ListSerializer):
+            return value
+
         user = self.context["request"].user
         task_id = self.instance.id if self.instance else None
 
         if Task.objects.filter(user=user, title=value).exclude(id=task_id).exists():
-            raise serializers.ValidationError(
-                "Задача с таким названием уже существует."
-            )
+            raise serializers.ValidationError(TITLE_TAKEN)
         return value
 
     def validate_due_date(self, value):
@@ -93,10 +223,13 @@ class TaskSerializer(serializers.ModelSerializer):
             for name in category_names
             if name not in existing_categories
         ]
-        created_categories = Category.objects.bulk_create(
-            new_categories, ignore_conflicts=True
-        )
-        return list(existing_categories.values()) + created_categories
+        if not new_categories:
+            return list(existing_categories.values())
+
+        Category.objects.bulk_create(new_categories, ignore_conflicts=True)
+        # The categories created concurrently by another request are skipped by
+        # `bulk_create` and would be returned unsaved, so all are selected again
+        return list(Category.objects.filter(name__in=category_names))
 
     def create(self, validated_data):
         """Creates a new task with categories."""
@@ -122,3 +255,39 @@ class TaskSerializer(serializers.ModelSerializer):
         data = super().to_representation(instance)
         data["categories"] = data.pop("category_objects")
         return data
+
+
+class TaskListQuerySerializer(serializers.Serializer):
+    """
+    The query parameters of the page of the task list.
+
+    - Status, Category: Filters by the status and the name of the category.
+    - Due_after, Due_before: the range of the date of execution, inclusive.
+    - Ordering: the field of the sorting, with "-" for descending order.
+    - Limit, Cursor: the size of the page and the position from the previous page.
+    """
+
+    status = serializers.ChoiceField(choices=Task.Status.choices, required=False)
+    category = serializers.CharField(max_length=50, required=False)
+    due_after = serializers.DateTimeField(required=False)
+    due_before = serializers.DateTimeField(required=False)
+    ordering = serializers.ChoiceField(choices=ORDERINGS, default=DEFAULT_ORDERING)
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.TASK_PAGE_MAX_LIMIT,
+        default=settings.TASK_PAGE_DEFAULT_LIMIT,
+    )
+    cursor = serializers.CharField(required=False)
+
+    def validate_category(self, value):
+        """Brings the name to the form the categories are stored in."""
+        return value.strip().title()
+
+    def validate(self, attrs):
+        """Checks that the range of the date of execution is not empty."""
+        due_after, due_before = attrs.get("due_after"), attrs.get("due_before")
+        if due_after and due_before and due_after > due_before:
+            raise serializers.ValidationError(
+                {"due_before": "Конец диапазона не может быть раньше начала."}
+            )
+        return attrs
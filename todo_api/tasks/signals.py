@@ -1,25 +1,60 @@
-from django.conf import settings
-from django.core.cache import cache
-from django.db.models.signals import post_delete, post_save
+from celery_tasks.comments import delete_task_comments
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from tasks.models import Task
+from tasks.cache import reset_cache_on_commit
+from tasks.models import Category, Task
 
 
-def reset_cache(user_id):
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def clear_task_cache(sender, instance, **kwargs):
     """
-    Removes the cache of the task list for the specified user.
+    Cleans the cache of the task and the user's task list to create, update or delete the task.
 
-    Param User_id: ID of the user for whom you need to clean the cache.
+    It is called automatically when the signals are triggered `post_save` and` post_delete`.
     """
-    cache.delete(settings.TASK_CACHE_KEY.format(user_id=user_id))
+    reset_cache_on_commit([(instance.id, instance.user_id)])
+
+
+@receiver(m2m_changed, sender=Task.categories.through)
+def clear_task_categories_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Cleans the cache of the tasks whose categories were changed, e.g. by `task.categories.set()`.
+    """
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            reset_cache_on_commit([(instance.id, instance.user_id)])
+        return
+
+    # Changed from the side of the category: `category.tasks.add(...)` etc.
+    if action in ("post_add", "post_remove"):
+        tasks = Task.objects.filter(id__in=pk_set)
+    elif action == "pre_clear":
+        tasks = instance.tasks.all()
+    else:
+        return
+    reset_cache_on_commit(tasks.values_list("id", "user_id"))
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def clear_category_tasks_cache(sender, instance, **kwargs):
+    """
+    Cleans the cache of the tasks showing the renamed or deleted category.
+    """
+    if kwargs.get("created"):
+        return
+    reset_cache_on_commit(instance.tasks.values_list("id", "user_id"))
 
 
-@receiver(post_save, sender=Task)
 @receiver(post_delete, sender=Task)
-def clear_task_cache(sender, instance, **kwargs):
+def schedule_comments_deletion(sender, instance, **kwargs):
     """
-    Cleans the user's quest to create, update or delete the task.
+    Schedules the removal of the comments of the deleted task in the comments microservice.
 
-    It is called automatically when the signals are triggered `post_save` and` post_delete`.
+    The job is enqueued only after the deletion is committed, whether the task
+    is deleted through the API, the admin or the bot.
     """
-    reset_cache(instance.user.id)
+    task_id = instance.id
+    transaction.on_commit(lambda: delete_task_comments.delay(task_id))
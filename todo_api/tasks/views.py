@@ -1,25 +1,49 @@
+import json
 import logging
 
 from django.conf import settings
-from django.core.cache import cache
-from django.db.models import Prefetch
-from rest_framework import viewsets
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import HttpResponse
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from tasks.cache import (
+    cache_list,
+    cache_tasks,
+    deferred_cache_reset,
+    get_cached_list,
+    get_cached_tasks,
+)
 from tasks.models import Category, Task
+from tasks.pagination import paginate_tasks
 from tasks.permissions import IsAuthenticatedOrTelegramBot
-from tasks.serializers import CategorySerializer, TaskSerializer
+from tasks.serializers import CategorySerializer, TaskListQuerySerializer, TaskSerializer
 
 logger = logging.getLogger(__name__)
 
+# Query parameters that switch the task list to one page (see `TaskListQuerySerializer`)
+PAGE_QUERY_PARAMS = {
+    "status",
+    "category",
+    "due_after",
+    "due_before",
+    "ordering",
+    "limit",
+    "cursor",
+}
+
 
 class TaskViewSet(viewsets.ModelViewSet):
     """
     ViewSet to manage user tasks.
 
     - Uses JWT authentication and custom-made access rights.
-    - Caches the list of tasks to increase performance.
-    - Supports CRUD operations.
+    - Caches the rendered list of tasks to increase performance.
+    - Supports CRUD operations, also for many tasks at once (`/tasks/bulk`).
     """
 
     serializer_class = TaskSerializer
@@ -28,30 +52,217 @@ class TaskViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """
-        Receives a cache list of user tasks.
-        If there is no cache, it loads from the database, cachs and returns.
+        Returns the user's tasks with their categories.
+
+        Detail actions look the task up by the primary key in this queryset,
+        only the rendered list is cached (see `list`).
 
         :return: Queryset User Tasks
         """
-        user_id = self.request.user.id
-        cache_key = settings.TASK_CACHE_KEY.format(user_id=user_id)
-        cached_tasks = cache.get(cache_key)
+        return Task.objects.filter(user=self.request.user.id).prefetch_related(
+            Prefetch("categories", queryset=Category.objects.only("id", "name"))
+        )
+
+    def list(self, request, *args, **kwargs):
+        """
+        Returns a list of user tasks.
+
+        Without query parameters all the tasks are returned: the rendered JSON
+        is cached per user and version of the task list and returned as is,
+        without running the serializers, on a cache hit. With filters,
+        ordering, `limit` or `cursor` one page is returned (see `list_page`).
+        """
+        if PAGE_QUERY_PARAMS.intersection(request.query_params):
+            return self.list_page(request)
+
+        user_id = request.user.id
+        version, content = get_cached_list(user_id)
+        if content is None:
+            task_ids = Task.objects.filter(user=user_id).values_list("id", flat=True)
+            rendered_tasks = self.render_tasks(list(task_ids))
+            content = b'{"tasks":[' + b",".join(rendered_tasks) + b"]}"
+            cache_list(user_id, version, content)
+
+        return HttpResponse(content, content_type="application/json")
+
+    def list_page(self, request):
+        """
+        Returns one page of the user tasks, filtered and ordered by the query parameters.
+
+        :return: {"tasks": [...], "next_cursor": cursor of the next page or null}
+        """
+        query = TaskListQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        tasks = Task.objects.filter(user=request.user.id)
+        if "status" in params:
+            tasks = tasks.filter(status=params["status"])
+        if "category" in params:
+            tasks = tasks.filter(categories__name=params["category"])
+        if "due_after" in params:
+            tasks = tasks.filter(due_date__gte=params["due_after"])
+        if "due_before" in params:
+            tasks = tasks.filter(due_date__lte=params["due_before"])
 
-        if cached_tasks is None:
-            cached_tasks = Task.objects.filter(user=user_id).prefetch_related(
-                Prefetch("categories", queryset=Category.objects.only("id", "name"))
+        task_ids, next_cursor = paginate_tasks(
+            tasks, params["ordering"], params["limit"], params.get("cursor")
+        )
+        content = (
+            b'{"tasks":['
+            + b",".join(self.render_tasks(task_ids))
+            + b'],"next_cursor":'
+            + json.dumps(next_cursor).encode()
+            + b"}"
+        )
+        return HttpResponse(content, content_type="application/json")
+
+    def render_tasks(self, task_ids):
+        """
+        Renders the tasks to JSON, taking the ones rendered before from the cache.
+
+        Only the tasks missing from the cache (e.g. just changed) are loaded
+        and serialized.
+
+        :return: JSON bytes of the tasks in the order of `task_ids`
+        """
+        rendered_tasks = get_cached_tasks(task_ids)
+
+        missing_ids = [task_id for task_id in task_ids if task_id not in rendered_tasks]
+        if missing_ids:
+            renderer = JSONRenderer()
+            serializer = self.get_serializer(
+                self.get_queryset().filter(id__in=missing_ids), many=True
             )
-            cache.set(cache_key, cached_tasks, timeout=settings.TASK_CACHE_TIMEOUT)
+            new_tasks = {task["id"]: renderer.render(task) for task in serializer.data}
+            cache_tasks(new_tasks)
+            rendered_tasks.update(new_tasks)
 
-        return cached_tasks
+        # Tasks deleted since their IDs were selected are skipped
+        return [
+            rendered_tasks[task_id] for task_id in task_ids if task_id in rendered_tasks
+        ]
 
-    def list(self, request, *args, **kwargs):
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def create_many(self, request):
         """
-        Returns a list of user tasks.
+        Creates many tasks at once.
+
+        The batch is validated as a whole: if any task is invalid, none is
+        created and the errors are returned in the order of the tasks.
+
+        :return: {"tasks": [...]} - the created tasks
         """
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({"tasks": serializer.data})
+        serializer = self.get_serializer(
+            data=self.get_batch(request, "tasks"),
+            many=True,
+        )
+        serializer.is_valid(raise_exception=True)
+        tasks = serializer.save()
+        return Response(self.render_batch(serializer, tasks), status=status.HTTP_201_CREATED)
+
+    @create_many.mapping.patch
+    def update_many(self, request):
+        """
+        Partially updates many tasks at once, each identified by its `id`.
+
+        Categories are replaced only for the tasks they are passed for.
+
+        :return: {"tasks": [...]} - the updated tasks
+        """
+        items = self.get_batch(request, "tasks")
+        task_ids = [
+            item.get("id") if isinstance(item, dict) and isinstance(item.get("id"), str) else None
+            for item in items
+        ]
+        tasks = self.get_queryset().in_bulk([task_id for task_id in task_ids if task_id])
+
+        errors, seen_ids = [], set()
+        for task_id in task_ids:
+            if task_id not in tasks:
+                errors.append({"id": ["Задача не найдена."]})
+            elif task_id in seen_ids:
+                errors.append({"id": ["Задача повторяется в запросе."]})
+            else:
+                errors.append({})
+            seen_ids.add(task_id)
+        if any(errors):
+            raise ValidationError(errors)
+
+        serializer = self.get_serializer(
+            [tasks[task_id] for task_id in task_ids],
+            data=items,
+            many=True,
+            partial=True,
+        )
+        serializer.is_valid(raise_exception=True)
+        tasks = serializer.save()
+        return Response(self.render_batch(serializer, tasks))
+
+    @create_many.mapping.delete
+    def destroy_many(self, request):
+        """
+        Deletes many tasks at once, the IDs of other users' tasks are ignored.
+
+        The cache is reset once for all the deleted tasks.
+
+        :return: {"deleted": number of the deleted tasks}
+        """
+        task_ids = self.get_batch(request, "ids")
+        if not all(isinstance(task_id, str) for task_id in task_ids):
+            raise ValidationError({"ids": ["Ожидается список идентификаторов."]})
+
+        with transaction.atomic(), deferred_cache_reset():
+            deleted = (
+                Task.objects.filter(user=request.user.id, id__in=task_ids)
+                .delete()[1]
+                .get(Task._meta.label, 0)
+            )
+        return Response({"deleted": deleted})
+
+    @staticmethod
+    def get_batch(request, key):
+        """
+        Takes the list of the items of the batch from the request body.
+
+        :raises ValidationError: if it is not a non-empty list within `TASK_BULK_MAX_SIZE`
+        """
+        items = request.data.get(key) if isinstance(request.data, dict) else None
+        if not isinstance(items, list):
+            raise ValidationError({key: ["Ожидается список."]})
+        if not items:
+            raise ValidationError({key: ["Список не может быть пустым."]})
+        if len(items) > settings.TASK_BULK_MAX_SIZE:
+            raise ValidationError(
+                {key: [f"Не более {settings.TASK_BULK_MAX_SIZE} элементов."]}
+            )
+        return items
+
+    @staticmethod
+    def render_batch(serializer, tasks):
+        """Loads the categories of the saved tasks with one query and renders them."""
+        prefetch_related_objects(
+            tasks, Prefetch("categories", queryset=Category.objects.only("id", "name"))
+        )
+        return {"tasks": serializer.data}
+
+    @action(detail=False, methods=["get"])
+    def owned(self, request):
+        """
+        Returns which of the given tasks belong to the user, or all the user's tasks.
+
+        Lets the comments service check the ownership of many tasks in one request.
+
+        :return: {"ids": [...]} - IDs from the comma-separated `ids` query parameter
+            owned by the user, or IDs of all the user's tasks if `ids` is not passed
+        """
+        owned_tasks = Task.objects.filter(user=request.user.id)
+        if "ids" in request.query_params:
+            ids = [task_id for task_id in request.query_params["ids"].split(",") if task_id]
+            owned_tasks = owned_tasks.filter(id__in=ids)
+
+        owned_ids = owned_tasks.order_by().values_list("id", flat=True)
+        return Response({"ids": list(owned_ids)})
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -105,9 +105,25 @@ CACHES = {
 }
 
 # Параметры кеширования для задач
-TASK_CACHE_KEY = "tasks_{user_id}"
+# Отрендеренный список задач хранится под текущей версией списка пользователя
+TASK_LIST_CACHE_KEY = "tasks:{user_id}:list:{version}"
+TASK_CACHE_VERSION_KEY = "tasks:{user_id}:version"
+# Отрендеренные задачи, из которых собирается список после изменения одной из них
+TASK_ITEM_CACHE_KEY = "tasks:item:{task_id}"
 TASK_CACHE_TIMEOUT = 60 * 5
 
+# Постраничная выдача списка задач (при передаче фильтров, сортировки или курсора)
+TASK_PAGE_DEFAULT_LIMIT = int(os.getenv("TASK_PAGE_DEFAULT_LIMIT", 50))
+TASK_PAGE_MAX_LIMIT = int(os.getenv("TASK_PAGE_MAX_LIMIT", 500))
+
+# Максимальное число задач в одном запросе /api/tasks/bulk
+TASK_BULK_MAX_SIZE = int(os.getenv("TASK_BULK_MAX_SIZE", 500))
+
+# Микросервис комментариев: комментарии удалённых задач удаляются в фоне
+COMMENTS_API_URL = os.getenv("COMMENTS_API_URL", "http://commentsapi:8090/")
+COMMENTS_SERVICE_TOKEN = os.getenv("COMMENTS_SERVICE_TOKEN", "")
+COMMENTS_PURGE_BATCH_SIZE = int(os.getenv("COMMENTS_PURGE_BATCH_SIZE", 1000))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 